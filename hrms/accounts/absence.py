@@ -0,0 +1,108 @@
+"""
+Set-based absent marking.
+
+The 10:45 sweep runs while check-ins peak, so instead of two lookups and an insert
+per employee it finds everyone to mark with a single anti-join query (employees
+with no check-in and no absent row for the day) and inserts them in bulk.
+mark_absent_for_range backfills days the scheduler missed the same way.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef
+
+from .models import Employee, Attendance, AbsentEmployeeDetails, Leave
+from .working_calendar import working_days
+
+AbsentSweep = namedtuple("AbsentSweep", ["date", "total", "absent"])
+
+
+def employees_to_mark_absent(day):
+    """
+    (email, fullname, department) of employees with no check-in, no absent row and
+    no approved Leave on day.
+    """
+    checked_in = Attendance.objects.filter(email_id=OuterRef("email_id"), date=day, check_in__isnull=False)
+    already_absent = AbsentEmployeeDetails.objects.filter(email_id=OuterRef("email_id"), date=day)
+    on_leave = Leave.objects.filter(
+        email_id=OuterRef("email_id"), status="Approved", start_date__lte=day, end_date__gte=day
+    )
+    return (
+        Employee.objects.filter(~Exists(checked_in), ~Exists(already_absent), ~Exists(on_leave))
+        .order_by("email_id")
+        .values_list("email_id", "fullname", "department")
+    )
+
+
+def mark_absent_for_date(day):
+    """
+    Mark every employee without a check-in or approved Leave on day as absent.
+    Returns AbsentSweep(date, total employees, [{"email", "fullname", "department"}, ...])
+    listing only the rows this call inserted.
+    """
+    rows = list(employees_to_mark_absent(day))
+    marked_today = AbsentEmployeeDetails.objects.filter(date=day)
+    before = set(marked_today.values_list("email_id", flat=True))
+    # bulk_create skips AbsentEmployeeDetails.save(), so fullname/department come from the query;
+    # ignore_conflicts covers a late check-in marking someone absent at the same moment
+    AbsentEmployeeDetails.objects.bulk_create(
+        [
+            AbsentEmployeeDetails(email_id=email, date=day, fullname=fullname, department=department)
+            for email, fullname, department in rows
+            if email not in before
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    # rows dropped by ignore_conflicts were already there, so only count the new ones
+    inserted = set(marked_today.values_list("email_id", flat=True)) - before
+    absent = [
+        {"email": email, "fullname": fullname, "department": department}
+        for email, fullname, department in rows
+        if email in inserted
+    ]
+    return AbsentSweep(day, Employee.objects.count(), absent)
+
+
+def _dates(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def mark_absent_for_range(start, end):
+    """
+    Backfill absent rows for start..end (inclusive), e.g. after the scheduler missed
+    some 10:45 runs. Sundays and Holiday dates are skipped, approved Leave excuses
+    the days it covers and nobody is marked absent before their date_joined.
+    Everything is worked out from four range queries, then inserted in bulk.
+    Returns {date: number of employees marked absent} for every working day in the range.
+    """
+    days = working_days(start, end)
+    if not days:
+        return {}
+
+    present = set(
+        Attendance.objects.filter(date__range=(start, end), check_in__isnull=False).values_list("email_id", "date")
+    )
+    already_absent = set(
+        AbsentEmployeeDetails.objects.filter(date__range=(start, end)).values_list("email_id", "date")
+    )
+    on_leave = set()
+    leaves = Leave.objects.filter(status="Approved", start_date__lte=end, end_date__gte=start)
+    for email, leave_start, leave_end in leaves.values_list("email_id", "start_date", "end_date"):
+        on_leave.update((email, day) for day in _dates(max(leave_start, start), min(leave_end, end)))
+    skip = present | already_absent | on_leave
+
+    rows, marked = [], dict.fromkeys(days, 0)
+    employees = Employee.objects.values_list("email_id", "fullname", "department", "date_joined")
+    for email, fullname, department, date_joined in employees.iterator(chunk_size=2000):
+        for day in days:
+            if (date_joined and day < date_joined) or (email, day) in skip:
+                continue
+            rows.append(AbsentEmployeeDetails(email_id=email, date=day, fullname=fullname, department=department))
+            marked[day] += 1
+
+    AbsentEmployeeDetails.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return marked
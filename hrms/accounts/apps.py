@@ -9,12 +9,25 @@ class AccountsConfig(AppConfig):
     name = 'accounts'
 
     def ready(self):
+        # Cached working calendars are dropped whenever a Holiday changes
+        from django.db.models.signals import post_save, post_delete
+        from .models import Holiday
+        from .working_calendar import holiday_changed
+        post_save.connect(holiday_changed, sender=Holiday, dispatch_uid="working_calendar_holiday_saved")
+        post_delete.connect(holiday_changed, sender=Holiday, dispatch_uid="working_calendar_holiday_deleted")
+
         # Import and start scheduler only when Django is fully loaded
-        from .scheduler import start_scheduler
+        from .scheduler import start_scheduler, start_scheduler_host
         
-        # Only start scheduler in the main process, not in subprocesses
+        # leader: every process (e.g. each gunicorn worker) joins the leader election
+        if settings.SCHEDULER_MODE == 'leader':
+            start_scheduler_host()
+            logger.info("Attendance scheduler waiting for leader election")
+            return
+
+        # autoreload: only start scheduler in the runserver main process, not in subprocesses
         import os
-        if os.environ.get('RUN_MAIN') == 'true':
+        if settings.SCHEDULER_MODE == 'autoreload' and os.environ.get('RUN_MAIN') == 'true':
             start_scheduler()
             # Use plain text instead of emojis to avoid encoding issues
             logger.info("Attendance scheduler initialized successfully")
\ No newline at end of file
@@ -0,0 +1,372 @@
+"""
+Attendance check-in pipeline.
+
+Office, work from home and manual (email + location) check-ins all run through
+CheckInPipeline. A policy holds what differs between them: where the person has to
+be, which face index partition is searched first, how the location is recorded and
+whether the 07:00 opening time applies (not to manual check-ins). Everything else is
+shared: the 10:45 deadline with its Sunday/holiday exemption, and writing Attendance
+and AbsentEmployeeDetails rows.
+
+A check-in runs as explicit stages: geofence, queue (waiting for a face pool
+process), decode, detect, encode, match, db and learn. Their durations are logged
+on this module's logger and returned to the client in a Server-Timing header, so a
+slow check-in can be traced to the stage that made it slow.
+"""
+import time
+import logging
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .constants import IST, CHECK_IN_START, CHECK_IN_DEADLINE
+from .models import Attendance, AbsentEmployeeDetails, Employee
+from .face_embeddings import get_people_by_email, learn_from_checkin
+from .face_matcher import match_faces
+from .face_pool import detect_faces, FaceEngineBusy, FaceEngineTimeout
+from .face_quality import ImageRejected
+from .geofence import locate_site
+from .working_calendar import is_working_day
+
+logger = logging.getLogger(__name__)
+
+OPENING_MESSAGE = "Check-in opens at 07:00 AM IST. Please try after 07:00."
+LATE_MESSAGE = "Late first attempt. Marked absent for today as no check-in before 10:45 AM IST."
+
+
+class CheckInFailed(Exception):
+    """Ends a check-in with a {"status": "fail"} response."""
+
+    def __init__(self, message, status=400, reason=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.reason = reason
+
+    def payload(self):
+        payload = {"status": "fail", "message": self.message}
+        if self.reason:
+            payload["reason"] = self.reason
+        return payload
+
+
+class StageTimer:
+    """Wall-clock seconds per pipeline stage, in the order the stages ran."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Value for the Server-Timing response header (durations in ms)."""
+        metrics = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        metrics.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def log(self, label, status):
+        stages = " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.stages.items())
+        logger.info(f"{label} check-in answered {status} in {self.total() * 1000:.1f}ms: {stages}")
+
+
+class CheckInPolicy:
+    """What differs between kinds of check-in."""
+
+    kind = None   # Attendance.location_type
+    label = None  # start of the user-facing messages
+    enforce_opening_time = True  # reject check-ins before CHECK_IN_START
+
+    def resolve_site(self, latitude, longitude):
+        """Return the office site the check-in happens at (or None), or raise CheckInFailed."""
+        return None
+
+    def partition(self, site):
+        """Face index partition searched before the whole index; None searches everyone."""
+        return None
+
+    def record_location(self, attendance, latitude, longitude, site):
+        attendance.latitude = latitude
+        attendance.longitude = longitude
+        attendance.location_type = self.kind
+        attendance.site_id = site.id if site else None
+
+
+class OfficePolicy(CheckInPolicy):
+    """Check-ins inside an office geofence; the site's partition is searched first."""
+
+    kind = "office"
+    label = "Office"
+
+    def resolve_site(self, latitude, longitude):
+        if latitude is None or longitude is None:
+            raise CheckInFailed("Latitude and longitude required")
+        result = locate_site(latitude, longitude)
+        if result.within:
+            return result.site
+        if result.site is None:
+            raise CheckInFailed("No office sites are configured for check-in.")
+        raise CheckInFailed(
+            f"User too far from office ({result.distance_meters:.2f} meters from {result.site.name}). "
+            f"Must be within {result.site.radius_meters}m."
+        )
+
+    def partition(self, site):
+        # a site without a partition searches the whole index
+        return site.face_partition or None
+
+
+class WorkFromHomePolicy(CheckInPolicy):
+    """Check-ins from anywhere; the location is stored when the device sends one."""
+
+    kind = "work"
+    label = "Work from home"
+
+
+class ManualPolicy(OfficePolicy):
+    """
+    Office check-ins for a known email without a face, e.g. from a badge reader.
+    Marked by staff, so they are accepted before the opening time as they always were.
+    """
+
+    enforce_opening_time = False
+
+
+POLICIES = {
+    "office": OfficePolicy(),
+    "work": WorkFromHomePolicy(),
+    "manual": ManualPolicy(),
+}
+
+
+class CheckInPipeline:
+    """One check-in request under a policy, at time now (defaults to the current time)."""
+
+    def __init__(self, policy, latitude, longitude, now=None):
+        self.policy = policy
+        self.latitude = latitude
+        self.longitude = longitude
+        self.now = timezone.localtime(now or timezone.now(), IST)
+        self.today = self.now.date()
+        self.time = self.now.time()
+        self.site = None
+        self.people = {}
+        self.timer = StageTimer()
+
+    # ------------------------------------------------------------------ entry points
+
+    def check_in_face(self, image_bytes):
+        """Check in the first face in image_bytes; returns a JsonResponse."""
+        return self._respond(self._check_in_face, image_bytes)
+
+    def check_in_group(self, image_bytes):
+        """Check in every recognised face in one kiosk frame; returns a JsonResponse."""
+        return self._respond(self._check_in_group, image_bytes)
+
+    def check_in_person(self, email):
+        """Manual check-in for email. Returns the outcome status or raises CheckInFailed."""
+        try:
+            self._open()
+            with self.timer.stage("db"):
+                person = get_people_by_email([email]).get(email)
+                if person is None:
+                    raise CheckInFailed("User not found", 404)
+            outcome = self._record({email: person})[email]
+        except CheckInFailed as e:
+            self.timer.log(self.policy.label, e.status)
+            raise
+        self.timer.log(self.policy.label, outcome)
+        return outcome
+
+    # ------------------------------------------------------------------ flows
+
+    def _respond(self, flow, *args):
+        try:
+            payload, status = flow(*args)
+        except CheckInFailed as e:
+            payload, status = e.payload(), e.status
+        response = JsonResponse(payload, status=status)
+        response["Server-Timing"] = self.timer.server_timing()
+        self.timer.log(self.policy.label, status)
+        return response
+
+    def _check_in_face(self, image_bytes):
+        self._open()
+        encoding = self._detect(image_bytes)[0].encoding
+        match, = self._match([encoding])
+        person = self.people.get(match.email) if match else None
+        if person is None:
+            raise CheckInFailed("No match found", 404)
+        logger.info(f"Face matched {match.email} (distance {match.distance:.3f}, margin {match.margin:.3f})")
+
+        outcome = self._record({person.email_id: person})[person.email_id]
+        self._learn([(match, encoding)])
+        if outcome == "absent":
+            raise CheckInFailed(LATE_MESSAGE)
+        return {"status": "success", "message": self._message(outcome, person), "email": person.email_id}, 200
+
+    def _check_in_group(self, image_bytes):
+        self._open()
+        detections = self._detect(image_bytes)
+        matches = self._match([d.encoding for d in detections])
+
+        results = [None] * len(detections)
+        present, learned = {}, []
+        # Closest faces first, so a person seen twice keeps their best match
+        order = sorted(range(len(detections)), key=lambda i: matches[i].distance if matches[i] else float("inf"))
+        for i in order:
+            detection, match = detections[i], matches[i]
+            top, right, bottom, left = detection.box
+            result = {
+                "box": {"top": top, "right": right, "bottom": bottom, "left": left},
+                "email": None,
+                "fullname": None,
+                "distance": round(match.distance, 4) if match else None,
+            }
+            results[i] = result
+
+            person = self.people.get(match.email) if match else None
+            if person is None:
+                result.update(status="unmatched", message="No match found")
+                continue
+            result.update(email=person.email_id, fullname=person.fullname)
+            if person.email_id in present:
+                result.update(status="duplicate", message=f"{person.fullname} already appears in this frame")
+                continue
+            present[person.email_id] = person
+            learned.append((match, detection.encoding))
+
+        outcomes = self._record(present)
+        for result in results:
+            if "status" not in result:
+                person = present[result["email"]]
+                outcome = outcomes[person.email_id]
+                result.update(status=outcome, message=self._message(outcome, person))
+        self._learn(learned)
+
+        logger.info(f"Group check-in: {len(detections)} faces, {len(present)} people")
+        return {"status": "success", "results": results}, 200
+
+    # ------------------------------------------------------------------ stages
+
+    def _open(self):
+        """Geofence and opening-time checks, done before any face work."""
+        with self.timer.stage("geofence"):
+            self.site = self.policy.resolve_site(self.latitude, self.longitude)
+        if self.policy.enforce_opening_time and self.time < CHECK_IN_START:
+            raise CheckInFailed(OPENING_MESSAGE)
+
+    def _detect(self, image_bytes):
+        pool_timings = {}
+        try:
+            detections = detect_faces(image_bytes, timings=pool_timings)
+        except FaceEngineBusy as e:
+            raise CheckInFailed(str(e), 503)
+        except FaceEngineTimeout as e:
+            raise CheckInFailed(str(e), 504)
+        except ImageRejected as e:
+            raise CheckInFailed(str(e), 400, e.reason)
+        finally:
+            for name, seconds in pool_timings.items():
+                self.timer.add(name, seconds)
+        if not detections:
+            raise CheckInFailed("No face detected")
+        return detections
+
+    def _match(self, encodings):
+        """Match encodings and load the matched people into self.people."""
+        with self.timer.stage("match"):
+            matches = match_faces(encodings, partition=self.policy.partition(self.site))
+            self.people = get_people_by_email({m.email for m in matches if m})
+        return matches
+
+    def _record(self, people):
+        """
+        Write the day's Attendance/AbsentEmployeeDetails rows for people ({email: person})
+        in one transaction. Returns {email: outcome}, where outcome is one of checked_in,
+        checked_out, already_marked or absent.
+        """
+        outcomes = {}
+        with self.timer.stage("db"), transaction.atomic():
+            existing = {
+                a.email_id: a
+                for a in Attendance.objects.select_for_update().filter(email_id__in=people.keys(), date=self.today)
+            }
+            late = None
+            new_rows, check_outs, absents = [], [], []
+            for email, person in people.items():
+                attendance = existing.get(email)
+                if attendance:
+                    if attendance.check_out:
+                        outcomes[email] = "already_marked"
+                    else:
+                        attendance.check_out = self.time
+                        self.policy.record_location(attendance, self.latitude, self.longitude, self.site)
+                        check_outs.append(attendance)
+                        outcomes[email] = "checked_out"
+                    continue
+
+                if late is None:
+                    late = self.time > CHECK_IN_DEADLINE and is_working_day(self.today)
+
+                # bulk_create skips save(), so fill the Employee details it would have set
+                is_employee = isinstance(person, Employee)
+                fullname = person.fullname if is_employee else None
+                department = person.department if is_employee else None
+                if late:
+                    absents.append(AbsentEmployeeDetails(
+                        email_id=email, date=self.today, fullname=fullname, department=department,
+                    ))
+                    outcomes[email] = "absent"
+                    continue
+
+                attendance = Attendance(
+                    email_id=email, date=self.today, check_in=self.time, fullname=fullname, department=department,
+                )
+                self.policy.record_location(attendance, self.latitude, self.longitude, self.site)
+                new_rows.append(attendance)
+                outcomes[email] = "checked_in"
+
+            # ignore_conflicts: a concurrent request may have checked the same person in
+            Attendance.objects.bulk_create(new_rows, ignore_conflicts=True)
+            Attendance.objects.bulk_update(
+                check_outs, ["check_out", "latitude", "longitude", "location_type", "site"]
+            )
+            AbsentEmployeeDetails.objects.bulk_create(absents, ignore_conflicts=True)
+        return outcomes
+
+    def _learn(self, matched):
+        with self.timer.stage("learn"):
+            for match, encoding in matched:
+                learn_from_checkin(match, encoding)
+
+    def _message(self, outcome, person):
+        if outcome == "checked_in":
+            return f"{self.policy.label} check-in marked for {person.fullname}"
+        if outcome == "checked_out":
+            return f"{self.policy.label} check-out marked for {person.fullname}"
+        if outcome == "already_marked":
+            return f"Attendance already marked for today ({person.fullname})"
+        return LATE_MESSAGE
+
+
+def run_checkin(kind, image_bytes, latitude, longitude, batch=False, now=None):
+    """Run an office ("office", optionally batch) or work from home ("work") check-in; returns a JsonResponse."""
+    pipeline = CheckInPipeline(POLICIES[kind], latitude, longitude, now)
+    if batch:
+        return pipeline.check_in_group(image_bytes)
+    return pipeline.check_in_face(image_bytes)
@@ -0,0 +1,106 @@
+"""
+Short-lived replay cache for face check-ins.
+
+A double tap on the kiosk or a mobile client retrying on a slow network uploads the
+same image again. Without this the retry repeats detection, encoding and the roster
+scan, and for an already checked-in person it would even record an instant check-out.
+Responses are cached for FACE_DEDUP_TTL seconds under a hash of the image bytes plus
+a coarse location bucket; a retry that arrives while the first request is still
+running waits for its result instead of starting a second one.
+"""
+import time
+import hashlib
+import logging
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "checkin-probe"
+POLL_INTERVAL = 0.1
+
+
+def _location_bucket(latitude, longitude):
+    try:
+        decimals = settings.FACE_DEDUP_LOCATION_DECIMALS
+        return f"{round(float(latitude), decimals)}:{round(float(longitude), decimals)}"
+    except (TypeError, ValueError):
+        return "none"
+
+
+def probe_key(kind, image_bytes, latitude=None, longitude=None):
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return f"{KEY_PREFIX}:{kind}:{_location_bucket(latitude, longitude)}:{digest}"
+
+
+def _replay(cached):
+    status_code, content, content_type = cached
+    response = HttpResponse(content, status=status_code, content_type=content_type)
+    response["X-Checkin-Replayed"] = "1"
+    return response
+
+
+def _safe(operation, *args):
+    try:
+        operation(*args)
+    except Exception as e:
+        logger.warning(f"Check-in dedup cache unavailable: {e}")
+
+
+def dedup_checkin(kind):
+    """
+    Decorator for check-in views taking an 'image' upload: identical uploads within
+    FACE_DEDUP_TTL get the first response back. Busy, timeout and server errors are
+    not cached so a retry gets a real second attempt.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            uploaded_file = request.FILES.get("image")
+            if not uploaded_file or not settings.FACE_DEDUP_TTL:
+                return view(request, *args, **kwargs)
+
+            image_bytes = uploaded_file.read()
+            uploaded_file.seek(0)
+            batch = str(request.POST.get("batch", "")).lower() in ("1", "true", "yes")
+            key = probe_key(
+                f"{kind}-batch" if batch else kind, image_bytes,
+                request.POST.get("latitude"), request.POST.get("longitude"),
+            )
+            lock_key = f"{key}:running"
+
+            owns_lock = False
+            try:
+                cached = cache.get(key)
+                if cached is None:
+                    owns_lock = cache.add(lock_key, 1, settings.FACE_POOL_TIMEOUT + 5)
+                if cached is None and not owns_lock:
+                    # The same upload is being processed right now: wait for its answer
+                    deadline = time.monotonic() + settings.FACE_POOL_TIMEOUT
+                    while cached is None and time.monotonic() < deadline and cache.get(lock_key):
+                        time.sleep(POLL_INTERVAL)
+                        cached = cache.get(key)
+            except Exception as e:
+                # A cache outage must never block check-ins
+                logger.warning(f"Check-in dedup cache unavailable: {e}")
+                return view(request, *args, **kwargs)
+
+            if cached is not None:
+                return _replay(cached)
+
+            try:
+                response = view(request, *args, **kwargs)
+                if response.status_code < 500:
+                    cached = (response.status_code, response.content, response.get("Content-Type"))
+                    _safe(cache.set, key, cached, settings.FACE_DEDUP_TTL)
+            finally:
+                # Only released once the result is stored, so waiters find it
+                if owns_lock:
+                    _safe(cache.delete, lock_key)
+            return response
+
+        return wrapper
+    return decorator
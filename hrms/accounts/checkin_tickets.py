@@ -0,0 +1,168 @@
+"""
+Asynchronous face check-ins.
+
+With async=true the attendance endpoints only store the upload as a CheckInTicket
+and answer 202 with the ticket id, so HTTP workers never wait on dlib. The
+process_checkin_tickets command claims pending tickets, runs the same check-in code
+as the synchronous endpoints with the submission time, stores the response on the
+ticket and pushes it to the matched people's devices through their FCM tokens.
+Devices without push can poll checkin_tickets/<id>/.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .models import CheckInTicket, FCMToken
+from .attendance_pipeline import run_checkin
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean "try again later" rather than a final answer
+RETRY_STATUSES = (503, 504)
+
+
+def wants_async_checkin(request):
+    return str(request.POST.get("async", "")).lower() in ("1", "true", "yes")
+
+
+def _coordinate(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def enqueue_checkin(kind, image_bytes, latitude, longitude, batch=False):
+    """Store the upload as a pending ticket and answer 202 with its id."""
+    ticket = CheckInTicket.objects.create(
+        kind=kind,
+        batch=batch,
+        image=image_bytes,
+        latitude=_coordinate(latitude),
+        longitude=_coordinate(longitude),
+    )
+    return JsonResponse({
+        "status": "queued",
+        "message": "Check-in received, result will follow",
+        "ticket_id": str(ticket.id),
+        "poll_url": f"/api/accounts/checkin_tickets/{ticket.id}/",
+    }, status=202)
+
+
+def ticket_payload(ticket):
+    return {
+        "ticket_id": str(ticket.id),
+        "status": ticket.status,
+        "http_status": ticket.http_status,
+        "result": ticket.result,
+        "submitted_at": ticket.submitted_at.isoformat(),
+        "finished_at": ticket.finished_at.isoformat() if ticket.finished_at else None,
+    }
+
+
+def claim_tickets(limit):
+    """
+    Atomically move up to `limit` pending tickets (or ones stuck in processing after a
+    worker crash) to processing. Rows locked by another worker are skipped.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.CHECKIN_TICKET_STALE_AFTER)
+    with transaction.atomic():
+        tickets = list(
+            CheckInTicket.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status="pending", not_before__isnull=True)
+                | Q(status="pending", not_before__lte=now)
+                | Q(status="processing", started_at__lt=stale)
+            )
+            .order_by("submitted_at")[:limit]
+        )
+        for ticket in tickets:
+            ticket.status = "processing"
+            ticket.attempts += 1
+            ticket.started_at = now
+        CheckInTicket.objects.bulk_update(tickets, ["status", "attempts", "started_at"])
+    return tickets
+
+
+def _matched_emails(result):
+    if not result:
+        return []
+    if result.get("email"):
+        return [result["email"]]
+    return [r["email"] for r in result.get("results", []) if r.get("email") and r.get("status") != "duplicate"]
+
+
+def notify_ticket(ticket):
+    """Push the ticket outcome to every registered device of the matched people."""
+    from firebase_admin import messaging
+
+    emails = _matched_emails(ticket.result)
+    if not emails:
+        return 0
+
+    sent = 0
+    title = "Attendance" if ticket.http_status and ticket.http_status < 300 else "Attendance not marked"
+    for fcm_token in FCMToken.objects.filter(email_id__in=emails):
+        body = ticket.result.get("message")
+        if not body:
+            body = next((r["message"] for r in ticket.result.get("results", []) if r.get("email") == fcm_token.email_id), "")
+        try:
+            messaging.send(messaging.Message(
+                notification=messaging.Notification(title=title, body=body),
+                data={"type": "checkin_result", "ticket_id": str(ticket.id), "status": ticket.status},
+                token=fcm_token.token,
+            ))
+            sent += 1
+        except messaging.UnregisteredError:
+            fcm_token.delete()
+        except Exception as e:
+            logger.warning(f"Could not push check-in result to {fcm_token.email_id}: {e}")
+    return sent
+
+
+def process_ticket(ticket):
+    """Run one claimed ticket and store its outcome. Returns the final ticket status."""
+    try:
+        response = run_checkin(
+            ticket.kind, bytes(ticket.image), ticket.latitude, ticket.longitude,
+            batch=ticket.batch, now=ticket.submitted_at,
+        )
+        http_status, result = response.status_code, json.loads(response.content)
+    except Exception as e:
+        logger.error(f"Check-in ticket {ticket.id} failed: {e}")
+        http_status, result = 500, {"status": "error", "message": str(e)}
+
+    if http_status in RETRY_STATUSES and ticket.attempts < settings.CHECKIN_TICKET_MAX_ATTEMPTS:
+        # Back off exponentially so the retries ride out the overload instead of adding to it
+        delay = settings.CHECKIN_TICKET_RETRY_DELAY * 2 ** (ticket.attempts - 1)
+        ticket.status = "pending"
+        ticket.not_before = timezone.now() + timedelta(seconds=delay)
+        ticket.save(update_fields=["status", "not_before"])
+        return ticket.status
+
+    ticket.status = "done" if http_status < 500 else "failed"
+    ticket.http_status = http_status
+    ticket.result = result
+    ticket.finished_at = timezone.now()
+    ticket.image = b""  # the upload is no longer needed
+    ticket.save(update_fields=["status", "http_status", "result", "finished_at", "image"])
+
+    try:
+        notify_ticket(ticket)
+    except Exception as e:
+        logger.warning(f"Check-in ticket {ticket.id} push failed: {e}")
+    return ticket.status
+
+
+def purge_finished_tickets():
+    """Delete finished tickets older than CHECKIN_TICKET_RETENTION seconds."""
+    cutoff = timezone.now() - timedelta(seconds=settings.CHECKIN_TICKET_RETENTION)
+    deleted, _ = CheckInTicket.objects.filter(status__in=["done", "failed"], finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,121 @@
+"""
+Streaming payroll and attendance exports.
+
+Rows come from a values_list() projection read with iterator(chunk_size=...), which
+is a server-side cursor on PostgreSQL, so nothing holds the whole table in memory.
+CSV is written row by row into a StreamingHttpResponse. XLSX can't be produced
+incrementally (it is a zip archive), so an openpyxl write-only workbook is spooled
+to a temporary file and that file is streamed back.
+"""
+import csv
+import tempfile
+from collections import namedtuple
+
+import openpyxl
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+
+from .models import Attendance, Payroll
+from .payroll import filter_by_period
+
+CHUNK_SIZE = 2000
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+Export = namedtuple("Export", ["name", "headers", "rows"])
+
+
+class Echo:
+    """File-like object whose write() returns the line csv.writer hands it."""
+
+    def write(self, value):
+        return value
+
+
+def _date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f"Invalid {name} date {value!r}, expected YYYY-MM-DD")
+    return day
+
+
+def payroll_export(params):
+    """Payrolls filtered by ?from/?to (yyyymm or yyyy-mm) and ?department."""
+    payrolls = filter_by_period(Payroll.objects.all(), params)
+    if params.get("department"):
+        payrolls = payrolls.filter(email__employee__department=params["department"])
+    fields = [
+        ("id", "id"),
+        ("email", "email_id"),
+        ("fullname", "email__employee__fullname"),
+        ("department", "email__employee__department"),
+        ("period", "period"),
+        ("month", "month"),
+        ("year", "year"),
+        ("basic_salary", "basic_salary"),
+        ("STD", "STD"),
+        ("LOP", "LOP"),
+        ("status", "status"),
+        ("pay_date", "pay_date"),
+    ]
+    rows = payrolls.order_by("period", "email_id").values_list(*(field for _, field in fields))
+    return Export("payrolls", [header for header, _ in fields], rows)
+
+
+def attendance_export(params):
+    """Attendance filtered by ?from/?to (YYYY-MM-DD, both inclusive) and ?department."""
+    records = Attendance.objects.all()
+    start, end = _date_param(params, "from"), _date_param(params, "to")
+    if start:
+        records = records.filter(date__gte=start)
+    if end:
+        records = records.filter(date__lte=end)
+    if params.get("department"):
+        records = records.filter(department=params["department"])
+    fields = [
+        ("email", "email_id"),
+        ("role", "email__role"),
+        ("fullname", "fullname"),
+        ("department", "department"),
+        ("date", "date"),
+        ("check_in", "check_in"),
+        ("check_out", "check_out"),
+        ("location_type", "location_type"),
+        ("site", "site__name"),
+    ]
+    rows = records.order_by("date", "email_id").values_list(*(field for _, field in fields))
+    return Export("attendance", [header for header, _ in fields], rows)
+
+
+def _csv_lines(export):
+    writer = csv.writer(Echo())
+    yield writer.writerow(export.headers)
+    for row in export.rows.iterator(chunk_size=CHUNK_SIZE):
+        yield writer.writerow(["" if value is None else value for value in row])
+
+
+def csv_response(export):
+    response = StreamingHttpResponse(_csv_lines(export), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{export.name}.csv"'
+    return response
+
+
+def xlsx_response(export):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(export.name)
+    sheet.append(export.headers)
+    for row in export.rows.iterator(chunk_size=CHUNK_SIZE):
+        sheet.append(row)
+    spool = tempfile.TemporaryFile()
+    workbook.save(spool)
+    spool.seek(0)
+    # FileResponse streams the spooled file in blocks and closes it when done
+    return FileResponse(spool, as_attachment=True, filename=f"{export.name}.xlsx", content_type=XLSX_CONTENT_TYPE)
+
+
+EXPORT_FORMATS = {
+    "csv": csv_response,
+    "xlsx": xlsx_response,
+}
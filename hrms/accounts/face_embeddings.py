@@ -0,0 +1,148 @@
+"""
+Face embedding store for attendance check-ins.
+Encodings are computed once when a profile picture is uploaded or changed
+and persisted in FaceEmbedding, so check-ins never re-download profile pictures.
+"""
+import logging
+from collections import defaultdict
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from .models import FaceEmbedding, FaceSample, Employee, HR, CEO, Manager, Admin
+from .face_pool import encode_faces
+
+logger = logging.getLogger(__name__)
+
+# face_recognition returns 128-d float64 vectors
+ENCODING_DIM = 128
+ENCODING_DTYPE = np.float64
+
+ROLE_MODELS = [Employee, HR, CEO, Manager, Admin]
+
+
+def encoding_to_bytes(encoding):
+    return np.asarray(encoding, dtype=ENCODING_DTYPE).tobytes()
+
+
+def encoding_from_bytes(data):
+    return np.frombuffer(bytes(data), dtype=ENCODING_DTYPE)
+
+
+def compute_encoding(image_bytes):
+    """Return the first face encoding found in image_bytes, or None if there is no face."""
+    # Profile pictures are curated uploads, the check-in quality gate does not apply
+    encodings = encode_faces(image_bytes, check_quality=False)
+    if not encodings:
+        return None
+    return encodings[0]
+
+
+def refresh_face_embedding(email, image_bytes=None, source_url=None):
+    """
+    Compute and store the face embedding for a user.
+    Uses image_bytes when available (fresh upload), otherwise downloads source_url once.
+    Removes any stale embedding when the new picture has no detectable face.
+    Returns True if an embedding was stored.
+    """
+    from .face_index import rebuild_face_index
+
+    try:
+        if image_bytes is None:
+            if not source_url:
+                FaceEmbedding.objects.filter(email_id=email).delete()
+                rebuild_face_index()
+                return False
+            response = requests.get(source_url, timeout=10)
+            if response.status_code != 200:
+                logger.warning(f"Could not fetch profile picture for {email}: HTTP {response.status_code}")
+                return False
+            image_bytes = response.content
+
+        encoding = compute_encoding(image_bytes)
+        if encoding is None:
+            FaceEmbedding.objects.filter(email_id=email).delete()
+            rebuild_face_index()
+            logger.warning(f"No face found in profile picture for {email}")
+            return False
+
+        FaceEmbedding.objects.update_or_create(
+            email_id=email,
+            defaults={
+                "encoding": encoding_to_bytes(encoding),
+                "source_url": source_url,
+            }
+        )
+        rebuild_face_index()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to refresh face embedding for {email}: {e}")
+        return False
+
+
+def load_known_samples():
+    """
+    Return a sorted list of (email, [encodings]) with every reference sample per person:
+    the profile picture embedding first, then the newest FaceSample rows, capped at
+    FACE_MAX_SAMPLES_PER_PERSON.
+    """
+    cap = settings.FACE_MAX_SAMPLES_PER_PERSON
+    samples = defaultdict(list)
+    for email, data in FaceEmbedding.objects.values_list("email_id", "encoding").iterator(chunk_size=1000):
+        samples[email].append(encoding_from_bytes(data))
+    extra = FaceSample.objects.order_by("email_id", "-created_at").values_list("email_id", "encoding")
+    for email, data in extra.iterator(chunk_size=1000):
+        if len(samples[email]) < cap:
+            samples[email].append(encoding_from_bytes(data))
+    return sorted(samples.items())
+
+
+def add_face_sample(email, encoding, source="upload"):
+    """
+    Store an extra reference encoding for email and drop the oldest extra samples
+    beyond FACE_MAX_SAMPLES_PER_PERSON (the profile picture counts as one).
+    """
+    FaceSample.objects.create(email_id=email, encoding=encoding_to_bytes(encoding), source=source)
+
+    keep = settings.FACE_MAX_SAMPLES_PER_PERSON
+    if FaceEmbedding.objects.filter(email_id=email).exists():
+        keep -= 1
+    stale = FaceSample.objects.filter(email_id=email).order_by("-created_at", "-id").values_list("id", flat=True)[max(keep, 0):]
+    FaceSample.objects.filter(id__in=list(stale)).delete()
+
+
+def learn_from_checkin(match, encoding):
+    """
+    Keep the probe of a very confident check-in as an extra sample (FACE_LEARN_FROM_CHECKINS).
+    At most one learned sample per person per day; never raises.
+    """
+    if not settings.FACE_LEARN_FROM_CHECKINS or match is None:
+        return
+    if match.distance > settings.FACE_LEARN_MAX_DISTANCE or match.margin < settings.FACE_LEARN_MIN_MARGIN:
+        return
+    try:
+        learned_today = FaceSample.objects.filter(
+            email_id=match.email, source="checkin", created_at__date=timezone.localdate()
+        ).exists()
+        if not learned_today:
+            add_face_sample(match.email, encoding, source="checkin")
+    except Exception as e:
+        logger.error(f"Failed to learn face sample for {match.email}: {e}")
+
+
+def get_people_by_email(emails):
+    """
+    Employee/HR/CEO/Manager/Admin records for emails, one query per role table.
+    Returns {email: person}; emails without a record are left out.
+    """
+    remaining = set(emails)
+    people = {}
+    for model in ROLE_MODELS:
+        if not remaining:
+            break
+        for person in model.objects.filter(email_id__in=remaining).select_related("email"):
+            people[person.email_id] = person
+        remaining -= people.keys()
+    return people
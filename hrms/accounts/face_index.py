@@ -0,0 +1,231 @@
+"""
+On-disk face embedding index shared by all gunicorn workers.
+
+Layout (little endian):
+    header      128 bytes: magic, version, count, dim, sample count, stamp, email table offset/length,
+                number of stored rows the index was built from, partition count, partition table length
+    centroids   count x dim float32, row i is the mean of emails[i]'s samples
+    samples     sample count x dim float32, grouped by person
+    offsets     count + 1 int64, samples of emails[i] are rows offsets[i]:offsets[i + 1]
+    bounds      partition count + 1 int64, partition p holds people bounds[p]:bounds[p + 1]
+    emails      UTF-8, newline separated
+    partitions  UTF-8 partition keys, newline separated
+
+People are sorted by (partition, email), so each partition (FACE_INDEX_PARTITION_FIELD
+of the Employee record, "" for everyone else) is a contiguous slice of every array.
+Partitions only narrow the first search; callers fall back to the whole index, so a
+person whose work location changed is still found until the next rebuild.
+
+Every worker opens the file with mmap and wraps the matrix with np.frombuffer, so
+the roster lives once in the page cache no matter how many workers are running.
+The file is rebuilt into a temp file and swapped in with os.replace, so readers
+always see either the old or the new index, never a partial one.
+"""
+import os
+import mmap
+import time
+import struct
+import logging
+import tempfile
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max, Count
+
+from .models import FaceEmbedding, FaceSample, Employee
+from .face_embeddings import ENCODING_DIM, load_known_samples
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"HRMSFIDX"
+VERSION = 3
+HEADER_FORMAT = "<8sIIIIqQQQIIQ"
+HEADER_SIZE = 128
+
+
+def get_index_path():
+    return settings.FACE_INDEX_PATH
+
+
+def _store_stamp():
+    """(stamp, count) describing the stored embeddings and samples, used to detect stale index files."""
+    profiles = FaceEmbedding.objects.aggregate(latest=Max("updated_at"), total=Count("email"))
+    samples = FaceSample.objects.aggregate(latest=Max("created_at"), total=Count("id"))
+    latest = max(filter(None, [profiles["latest"], samples["latest"]]), default=None)
+    stamp = int(latest.timestamp() * 1_000_000) if latest else 0
+    return stamp, profiles["total"] + samples["total"]
+
+
+def partition_key(value):
+    """Normalised partition key for a work location (or whatever field partitions the index)."""
+    return " ".join(str(value or "").split()).lower()
+
+
+def _load_partitions():
+    """{email: partition key} from the configured Employee field; empty when partitioning is off."""
+    field = settings.FACE_INDEX_PARTITION_FIELD
+    if not field:
+        return {}
+    return {
+        email: partition_key(value)
+        for email, value in Employee.objects.values_list("email_id", field).iterator(chunk_size=1000)
+    }
+
+
+def build_face_index(path=None):
+    """Write all stored embeddings and samples to the index file atomically. Returns the person count."""
+    path = path or get_index_path()
+    stamp, rows = _store_stamp()
+
+    partitions_by_email = _load_partitions()
+    known = sorted(load_known_samples(), key=lambda item: (partitions_by_email.get(item[0], ""), item[0]))
+    emails = [email for email, _ in known]
+
+    partitions = []
+    bounds = [0]
+    for i, email in enumerate(emails):
+        key = partitions_by_email.get(email, "")
+        if not partitions or partitions[-1] != key:
+            if partitions:
+                bounds.append(i)
+            partitions.append(key)
+    bounds.append(len(emails))
+    bounds = np.asarray(bounds if partitions else [0], dtype=np.int64)
+
+    offsets = np.zeros(len(known) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(samples) for _, samples in known])
+    samples = np.empty((int(offsets[-1]), ENCODING_DIM), dtype=np.float32)
+    centroids = np.empty((len(known), ENCODING_DIM), dtype=np.float32)
+    for i, (_, person_samples) in enumerate(known):
+        samples[offsets[i]:offsets[i + 1]] = person_samples
+        centroids[i] = samples[offsets[i]:offsets[i + 1]].mean(axis=0)
+
+    email_table = "\n".join(emails).encode("utf-8")
+    partition_table = "\n".join(partitions).encode("utf-8")
+    emails_offset = HEADER_SIZE + centroids.nbytes + samples.nbytes + offsets.nbytes + bounds.nbytes
+    header = struct.pack(
+        HEADER_FORMAT, MAGIC, VERSION, len(known), ENCODING_DIM, len(samples),
+        stamp, emails_offset, len(email_table), rows, len(partitions), 0, len(partition_table)
+    ).ljust(HEADER_SIZE, b"\0")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".face_index.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(header)
+            tmp.write(centroids.tobytes())
+            tmp.write(samples.tobytes())
+            tmp.write(offsets.tobytes())
+            tmp.write(bounds.tobytes())
+            tmp.write(email_table)
+            tmp.write(partition_table)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    logger.info(f"Face index rebuilt with {len(known)} people, {len(samples)} samples and {len(partitions)} partitions at {path}")
+    return len(known)
+
+
+class FaceIndex:
+    """
+    Read-only memory-mapped view of an index file. matrix (the centroids), samples and
+    sample_offsets are zero-copy views over the mmap; partitions maps a partition key
+    to its (start, end) range of people.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = struct.unpack_from("<8sI", self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unsupported face index file: {path}")
+        (_, _, count, dim, sample_count, stamp, emails_offset, emails_length, rows,
+         partition_count, _, partitions_length) = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+
+        self.count = count
+        self.dim = dim
+        self.stamp = stamp
+        self.rows = rows
+        self.sample_count = sample_count
+        offset = HEADER_SIZE
+        self.matrix = np.frombuffer(self._mmap, dtype=np.float32, count=count * dim, offset=offset).reshape(count, dim)
+        offset += self.matrix.nbytes
+        self.samples = np.frombuffer(self._mmap, dtype=np.float32, count=sample_count * dim, offset=offset).reshape(sample_count, dim)
+        offset += self.samples.nbytes
+        self.sample_offsets = np.frombuffer(self._mmap, dtype=np.int64, count=count + 1, offset=offset)
+        offset += self.sample_offsets.nbytes
+        bounds = np.frombuffer(self._mmap, dtype=np.int64, count=partition_count + 1, offset=offset)
+        table = self._mmap[emails_offset:emails_offset + emails_length].decode("utf-8")
+        self.emails = table.split("\n") if count else []
+
+        offset = emails_offset + emails_length
+        names = self._mmap[offset:offset + partitions_length].decode("utf-8").split("\n")
+        self.partitions = {
+            name: (int(bounds[p]), int(bounds[p + 1])) for p, name in enumerate(names[:partition_count])
+        }
+
+
+_lock = threading.Lock()
+_current = None
+_last_check = 0.0
+
+
+def _file_id(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def get_face_index():
+    """
+    Return the shared FaceIndex for this process.
+    Re-opens the file when another worker swapped it in, and rebuilds it when the
+    stored embeddings or samples changed (checked at most every FACE_INDEX_CHECK_INTERVAL seconds).
+    """
+    global _current, _last_check
+    path = get_index_path()
+
+    with _lock:
+        file_id = _file_id(path)
+        if file_id is None:
+            build_face_index(path)
+            file_id = _file_id(path)
+
+        if _current is None or _current.file_id != file_id:
+            try:
+                _current = FaceIndex(path)
+            except ValueError:
+                # File written by an older index format: rebuild it in place
+                build_face_index(path)
+                _current = FaceIndex(path)
+            _last_check = time.monotonic()
+
+        if time.monotonic() - _last_check >= settings.FACE_INDEX_CHECK_INTERVAL:
+            _last_check = time.monotonic()
+            stamp, count = _store_stamp()
+            if stamp != _current.stamp or count != _current.rows:
+                build_face_index(path)
+                _current = FaceIndex(path)
+
+        return _current
+
+
+def rebuild_face_index():
+    """Rebuild after an embedding changed; never lets an index failure break the caller."""
+    try:
+        build_face_index()
+    except Exception as e:
+        logger.error(f"Failed to rebuild face index: {e}")
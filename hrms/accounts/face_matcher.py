@@ -0,0 +1,138 @@
+"""
+Vectorized face matching for attendance check-ins.
+Every person is represented by the centroid of their reference samples. A probe is
+first compared against all centroids in a single NumPy operation, then against the
+individual samples of the closest few people for the final decision.
+"""
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+
+from .face_index import get_face_index, partition_key
+
+# Same threshold the check-in views used with face_recognition.compare_faces
+DEFAULT_TOLERANCE = 0.5
+
+FaceMatch = namedtuple("FaceMatch", ["email", "distance", "margin"])
+
+
+class FaceMatcher:
+    """
+    Two-pass search of probe encodings against the roster: centroid matrix first,
+    nearest individual sample among the top candidates second.
+    samples rows sample_offsets[i]:sample_offsets[i + 1] belong to emails[i]; without
+    samples every centroid is treated as the person's only sample.
+    """
+
+    def __init__(self, emails, encodings, samples=None, sample_offsets=None):
+        self.emails = list(emails)
+        if len(self.emails):
+            self.matrix = np.ascontiguousarray(encodings, dtype=np.float32)
+        else:
+            self.matrix = np.empty((0, 128), dtype=np.float32)
+        if samples is None:
+            self.samples = self.matrix
+            self.sample_offsets = np.arange(len(self.emails) + 1, dtype=np.int64)
+        else:
+            self.samples = np.ascontiguousarray(samples, dtype=np.float32)
+            self.sample_offsets = np.asarray(sample_offsets, dtype=np.int64)
+
+    @classmethod
+    def from_index(cls, partition=None):
+        """
+        Matcher over the shared memory-mapped index; the matrices are not copied.
+        With partition, only the people in that index partition (none if it does not exist).
+        """
+        index = get_face_index()
+        if partition is None:
+            return cls(index.emails, index.matrix, index.samples, index.sample_offsets)
+
+        start, end = index.partitions.get(partition_key(partition), (0, 0))
+        offsets = index.sample_offsets[start:end + 1]
+        return cls(
+            index.emails[start:end],
+            index.matrix[start:end],
+            index.samples[offsets[0]:offsets[-1]],
+            offsets - offsets[0],
+        )
+
+    def __len__(self):
+        return len(self.emails)
+
+    def distances(self, probe):
+        """Euclidean distance from probe to every person's centroid."""
+        probe = np.asarray(probe, dtype=np.float32)
+        return np.linalg.norm(self.matrix - probe, axis=1)
+
+    def best_match(self, probe, tolerance=DEFAULT_TOLERANCE):
+        """
+        Return FaceMatch(email, distance, margin) for the person with the closest sample
+        within tolerance, or None. margin is how much closer the best match is than the
+        runner-up (inf when there is only one candidate).
+        """
+        return self.best_matches([probe], tolerance)[0]
+
+    def distance_matrix(self, probes):
+        """
+        Distances from every probe to every centroid as a (probes, roster) matrix,
+        using |a - b|^2 = |a|^2 + |b|^2 - 2ab so the whole batch is one matrix product.
+        """
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, self.matrix.shape[1])
+        squared = (
+            np.einsum("ij,ij->i", probes, probes)[:, None]
+            + np.einsum("ij,ij->i", self.matrix, self.matrix)[None, :]
+            - 2.0 * (probes @ self.matrix.T)
+        )
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    def best_matches(self, probes, tolerance=DEFAULT_TOLERANCE, candidates=None):
+        """
+        best_match for a batch of probes. All probes are ranked against every centroid
+        in one matrix product; the closest `candidates` people per probe are then
+        re-scored by their nearest individual sample.
+        Returns a list aligned with probes holding a FaceMatch or None.
+        """
+        if not len(self) or not len(probes):
+            return [None] * len(probes)
+
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, self.matrix.shape[1])
+        candidates = min(candidates or settings.FACE_CENTROID_CANDIDATES, len(self))
+        centroid_distances = self.distance_matrix(probes)
+        if candidates < len(self):
+            shortlist = np.argpartition(centroid_distances, candidates - 1, axis=1)[:, :candidates]
+        else:
+            shortlist = np.broadcast_to(np.arange(len(self)), centroid_distances.shape)
+
+        matches = []
+        for probe, people in zip(probes, shortlist):
+            starts, ends = self.sample_offsets[people], self.sample_offsets[people + 1]
+            rows = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+            sample_distances = np.linalg.norm(self.samples[rows] - probe, axis=1)
+            # Nearest sample per candidate: rows are grouped per person in shortlist order
+            nearest = np.minimum.reduceat(sample_distances, np.concatenate([[0], np.cumsum(ends - starts)[:-1]]))
+
+            order = np.argsort(nearest)
+            best = people[order[0]]
+            distance = float(nearest[order[0]])
+            margin = float(nearest[order[1]] - nearest[order[0]]) if len(order) > 1 else float("inf")
+            matches.append(FaceMatch(self.emails[best], distance, margin) if distance <= tolerance else None)
+        return matches
+
+
+def match_faces(probes, partition=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    Match probes against one index partition first (e.g. the office that passed the
+    geofence) and against the whole index only for the probes it could not place.
+    Returns a list aligned with probes holding a FaceMatch or None.
+    """
+    if partition is None:
+        return FaceMatcher.from_index().best_matches(probes, tolerance)
+
+    matches = FaceMatcher.from_index(partition).best_matches(probes, tolerance)
+    misses = [i for i, match in enumerate(matches) if match is None]
+    if misses:
+        fallback = FaceMatcher.from_index().best_matches([probes[i] for i in misses], tolerance)
+        for i, match in zip(misses, fallback):
+            matches[i] = match
+    return matches
@@ -0,0 +1,168 @@
+"""
+Process pool for CPU-bound face encoding.
+
+face_recognition.face_encodings (dlib HOG detector plus ResNet) holds the GIL for
+the whole call, so running it inline blocks the request worker. Check-in views
+submit raw image bytes here instead; the work is spread over a bounded pool of
+processes, with a cap on in-flight jobs and a per-job timeout.
+"""
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FaceEngineBusy(Exception):
+    """Raised when too many encodings are already queued."""
+
+
+class FaceEngineTimeout(Exception):
+    """Raised when an encoding did not finish within the timeout."""
+
+
+FaceDetection = namedtuple("FaceDetection", ["box", "encoding"])
+
+
+def _detect_faces(image_bytes, max_edge, limits=None):
+    """
+    Runs inside a pool process: decode and downscale the image in memory, run the
+    quality gate when limits are given, detect faces and encode them.
+    Boxes are (top, right, bottom, left) in original-image pixels.
+    Returns (detections, {stage: seconds}) for the decode, detect and encode stages.
+    """
+    import face_recognition
+    from .face_preprocess import prepare_image, map_box_to_original
+    from .face_quality import check_frame, filter_small_faces
+
+    started = time.perf_counter()
+    prepared = prepare_image(image_bytes, max_edge)
+    if limits:
+        check_frame(prepared, limits)
+    decoded = time.perf_counter()
+    locations = face_recognition.face_locations(prepared.array)
+    if limits:
+        locations = filter_small_faces(locations, limits)
+    detected = time.perf_counter()
+    stages = {"decode": decoded - started, "detect": detected - decoded}
+    if not locations:
+        return [], stages
+    encodings = face_recognition.face_encodings(prepared.array, known_face_locations=locations)
+    stages["encode"] = time.perf_counter() - detected
+    detections = [
+        FaceDetection(map_box_to_original(box, prepared.scale), encoding)
+        for box, encoding in zip(locations, encodings)
+    ]
+    return detections, stages
+
+
+def pool_size():
+    """
+    Encoding processes in this web worker. Every gunicorn worker (WEB_CONCURRENCY of
+    them) has its own pool, so by default the CPU cores are split between them
+    instead of each worker starting one process per core.
+    """
+    if settings.FACE_POOL_WORKERS:
+        return settings.FACE_POOL_WORKERS
+    return max(1, (os.cpu_count() or 1) // settings.WEB_CONCURRENCY)
+
+
+def max_pending():
+    """This worker's share of the FACE_POOL_MAX_PENDING in-flight encodings."""
+    return max(1, settings.FACE_POOL_MAX_PENDING // settings.WEB_CONCURRENCY)
+
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+def _get_executor():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = pool_size()
+            # spawn keeps pool processes free of the parent's DB connections and threads
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            if _slots is None:
+                _slots = threading.BoundedSemaphore(max_pending())
+            logger.info(f"Face encoding pool started with {workers} processes")
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def submit(fn, *args):
+    """Submit fn(*args) to the pool, enforcing the queue-depth limit. Returns a Future."""
+    executor = _get_executor()
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        raise FaceEngineBusy("Face recognition is busy, please retry in a moment")
+    try:
+        future = executor.submit(fn, *args)
+    except BrokenProcessPool:
+        slots.release()
+        _reset_executor()
+        raise
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def quality_limits():
+    """Thresholds for the pre-detection quality gate, or None when it is disabled."""
+    if not settings.FACE_QUALITY_GATE:
+        return None
+    return {
+        "min_image_edge": settings.FACE_MIN_IMAGE_EDGE,
+        "min_brightness": settings.FACE_MIN_BRIGHTNESS,
+        "max_brightness": settings.FACE_MAX_BRIGHTNESS,
+        "min_contrast": settings.FACE_MIN_CONTRAST,
+        "min_sharpness": settings.FACE_MIN_SHARPNESS,
+        "min_face_size": settings.FACE_MIN_FACE_SIZE,
+    }
+
+
+def detect_faces(image_bytes, timeout=None, check_quality=True, timings=None):
+    """
+    Return a FaceDetection for every face in image_bytes, computed in the pool.
+    With check_quality, unusable frames raise face_quality.ImageRejected before detection.
+    When a timings dict is given, the seconds spent in each stage inside the pool
+    (decode, detect, encode) and waiting for a pool process (queue) are added to it.
+    """
+    timeout = timeout if timeout is not None else settings.FACE_POOL_TIMEOUT
+    limits = quality_limits() if check_quality else None
+    started = time.perf_counter()
+    future = submit(_detect_faces, image_bytes, settings.FACE_MAX_IMAGE_EDGE, limits)
+    try:
+        detections, stages = future.result(timeout=timeout)
+        if timings is not None:
+            timings.update(stages)
+            timings["queue"] = max(0.0, time.perf_counter() - started - sum(stages.values()))
+        return detections
+    except FutureTimeoutError:
+        future.cancel()
+        raise FaceEngineTimeout(f"Face recognition timed out after {timeout}s")
+    except BrokenProcessPool:
+        _reset_executor()
+        raise
+
+
+def encode_faces(image_bytes, timeout=None, check_quality=True):
+    """Return the list of face encodings in image_bytes, computed in the pool."""
+    return [detection.encoding for detection in detect_faces(image_bytes, timeout, check_quality)]
@@ -0,0 +1,62 @@
+"""
+In-memory image preparation for face detection.
+
+Uploads are decoded straight from bytes (no temp files), rotated according to
+their EXIF orientation and downscaled so the longest edge is at most
+FACE_MAX_IMAGE_EDGE before detection. Face boxes found on the small image are
+mapped back to original-image coordinates.
+"""
+from io import BytesIO
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .face_quality import ImageRejected
+
+PreparedImage = namedtuple("PreparedImage", ["array", "scale", "original_size"])
+
+EXIF_ORIENTATION = 0x0112
+
+
+def prepare_image(image_bytes, max_edge):
+    """
+    Decode image_bytes into an RGB uint8 array ready for face detection.
+    scale is the factor applied to the original (<= 1), original_size is (width, height)
+    after EXIF rotation. Raises ImageRejected("unreadable") when the bytes can't be decoded.
+    """
+    try:
+        return _prepare_image(image_bytes, max_edge)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise ImageRejected("unreadable", "Image could not be read, please retake the photo")
+
+
+def _prepare_image(image_bytes, max_edge):
+    image = Image.open(BytesIO(image_bytes))
+
+    # Size of the full-resolution image as the user sees it (after EXIF rotation)
+    width, height = image.size
+    if image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+        width, height = height, width
+    original_size = (width, height)
+
+    if max_edge and max(width, height) > max_edge:
+        # Let the JPEG decoder skip detail we would throw away anyway
+        image.draft("RGB", (max_edge, max_edge))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGB")
+
+    if max_edge and max(image.size) > max_edge:
+        ratio = max_edge / max(image.size)
+        new_size = (max(1, round(image.width * ratio)), max(1, round(image.height * ratio)))
+        image = image.resize(new_size, Image.BILINEAR)
+
+    scale = image.width / original_size[0]
+    return PreparedImage(np.asarray(image), scale, original_size)
+
+
+def map_box_to_original(box, scale):
+    """Map a (top, right, bottom, left) box from the downscaled image back to the original."""
+    if scale == 1.0:
+        return tuple(int(v) for v in box)
+    return tuple(int(round(v / scale)) for v in box)
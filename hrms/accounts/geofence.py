@@ -0,0 +1,144 @@
+"""
+Geofence engine for office check-ins.
+
+All active OfficeSite rows are loaded once into NumPy arrays. A location is first
+tested against each site's bounding box (a few comparisons per site), and the
+haversine distance is only computed for the sites whose box contains it, which
+keeps a lookup well under a millisecond with hundreds of sites. The table is
+reloaded when a site is saved or deleted in this process, and other processes
+notice changes within GEOFENCE_CHECK_INTERVAL seconds.
+"""
+import time
+import threading
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max, Count
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import OfficeSite
+
+EARTH_RADIUS_METERS = 6371008.8
+
+Site = namedtuple("Site", ["id", "name", "latitude", "longitude", "radius_meters", "face_partition"])
+GeofenceResult = namedtuple("GeofenceResult", ["site", "distance_meters", "within"])
+
+
+class SiteTable:
+    """Vectorized nearest-site lookup over a fixed list of sites."""
+
+    def __init__(self, sites):
+        self.sites = list(sites)
+        latitudes = np.array([s.latitude for s in self.sites], dtype=np.float64)
+        longitudes = np.array([s.longitude for s in self.sites], dtype=np.float64)
+        self.radius = np.array([s.radius_meters for s in self.sites], dtype=np.float64)
+
+        self.lat_rad = np.radians(latitudes)
+        self.lon_rad = np.radians(longitudes)
+        self.cos_lat = np.cos(self.lat_rad)
+
+        # Degrees spanned by each radius; the box always contains the circle
+        lat_span = np.degrees(self.radius / EARTH_RADIUS_METERS)
+        lon_span = np.degrees(self.radius / (EARTH_RADIUS_METERS * np.maximum(self.cos_lat, 1e-6)))
+        self.min_lat, self.max_lat = latitudes - lat_span, latitudes + lat_span
+        self.min_lon, self.max_lon = longitudes - lon_span, longitudes + lon_span
+
+    def __len__(self):
+        return len(self.sites)
+
+    def distances(self, latitude, longitude, rows=slice(None)):
+        """Haversine distance in meters from the point to the sites at rows."""
+        phi = np.radians(latitude)
+        d_phi = self.lat_rad[rows] - phi
+        d_lambda = self.lon_rad[rows] - np.radians(longitude)
+        a = np.sin(d_phi / 2) ** 2 + np.cos(phi) * self.cos_lat[rows] * np.sin(d_lambda / 2) ** 2
+        return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def locate(self, latitude, longitude):
+        """
+        GeofenceResult for the nearest site whose radius contains the point, or for the
+        nearest site overall (within=False) when none does.
+        """
+        if not self.sites:
+            return GeofenceResult(None, float("inf"), False)
+
+        candidates = np.flatnonzero(
+            (self.min_lat <= latitude) & (latitude <= self.max_lat)
+            & (self.min_lon <= longitude) & (longitude <= self.max_lon)
+        )
+        if len(candidates):
+            distances = self.distances(latitude, longitude, candidates)
+            inside = distances <= self.radius[candidates]
+            if inside.any():
+                best = int(np.argmin(np.where(inside, distances, np.inf)))
+                return GeofenceResult(self.sites[candidates[best]], float(distances[best]), True)
+
+        # Outside every fence: report the nearest site for the error message
+        distances = self.distances(latitude, longitude)
+        best = int(np.argmin(distances))
+        return GeofenceResult(self.sites[best], float(distances[best]), False)
+
+
+def _load_sites():
+    return [
+        Site(*row) for row in OfficeSite.objects.filter(is_active=True).order_by("id").values_list(
+            "id", "name", "latitude", "longitude", "radius_meters", "face_partition"
+        )
+    ]
+
+
+def _site_stamp():
+    stats = OfficeSite.objects.aggregate(latest=Max("updated_at"), total=Count("id"))
+    return stats["latest"], stats["total"]
+
+
+_lock = threading.Lock()
+_table = None
+_stamp = None
+_last_check = 0.0
+
+
+def get_site_table():
+    """Return the cached SiteTable, reloading it when the OfficeSite table changed."""
+    global _table, _stamp, _last_check
+    with _lock:
+        if _table is None or time.monotonic() - _last_check >= settings.GEOFENCE_CHECK_INTERVAL:
+            _last_check = time.monotonic()
+            stamp = _site_stamp()
+            if _table is None or stamp != _stamp:
+                _table = SiteTable(_load_sites())
+                _stamp = stamp
+        return _table
+
+
+def invalidate_site_table():
+    global _table
+    with _lock:
+        _table = None
+
+
+@receiver(post_save, sender=OfficeSite)
+@receiver(post_delete, sender=OfficeSite)
+def _office_site_changed(sender, **kwargs):
+    invalidate_site_table()
+
+
+def locate_site(latitude, longitude):
+    """GeofenceResult(site, distance_meters, within) for a check-in location."""
+    return get_site_table().locate(float(latitude), float(longitude))
+
+
+def home_site(face_partition=None):
+    """
+    Site an employee is attached to when there is no location to go by: the first
+    active site of their face partition (work location), else the first active site.
+    None when there are no sites.
+    """
+    sites = get_site_table().sites
+    if face_partition:
+        for site in sites:
+            if site.face_partition.lower() == face_partition.lower():
+                return site
+    return sites[0] if sites else None
@@ -0,0 +1,92 @@
+"""
+Registry of background jobs.
+
+A job is a plain function returning a JSON-serializable dict describing what it did;
+its "rows" entry is recorded as the run's rows_affected. The scheduler adds every
+registered job with its cron schedule, and run_job records each execution, whether
+scheduled or triggered through the API, as a JobRun with its duration, result and
+error, so batch-job latency can be tracked over time.
+"""
+import os
+import time
+import socket
+import logging
+import traceback
+from collections import namedtuple
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .constants import IST, CHECK_IN_DEADLINE
+from .models import JobRun
+from .absence import mark_absent_for_date
+from .working_calendar import is_working_day, holiday_name
+
+logger = logging.getLogger(__name__)
+
+Job = namedtuple("Job", ["id", "name", "func", "schedule"])
+
+JOBS = {}
+
+
+def job(job_id, name, **schedule):
+    """Register func as job_id, run on the cron schedule given as APScheduler cron fields."""
+    def register(func):
+        JOBS[job_id] = Job(job_id, name, func, schedule)
+        return func
+    return register
+
+
+def run_job(job_id, trigger="schedule"):
+    """Run a registered job now and record it as a JobRun, which is returned."""
+    job = JOBS[job_id]
+    close_old_connections()  # scheduler threads outlive CONN_MAX_AGE like any other thread
+    run = JobRun.objects.create(job=job_id, trigger=trigger, host=f"{socket.gethostname()}:{os.getpid()}")
+    started = time.perf_counter()
+    try:
+        result = job.func() or {}
+        run.status = "success"
+        run.result = result
+        run.rows_affected = result.get("rows")
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}")
+        run.status = "failed"
+        run.error = traceback.format_exc()
+    run.duration_ms = (time.perf_counter() - started) * 1000
+    run.finished_at = timezone.now()
+    run.save(update_fields=["status", "result", "rows_affected", "error", "duration_ms", "finished_at"])
+    logger.info(f"Job {job_id} {run.status} in {run.duration_ms:.0f}ms")
+    close_old_connections()
+    return run
+
+
+def job_run_payload(run):
+    return {
+        "id": run.id,
+        "job": run.job,
+        "trigger": run.trigger,
+        "status": run.status,
+        "host": run.host,
+        "started_at": run.started_at.isoformat(),
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+        "duration_ms": round(run.duration_ms, 1) if run.duration_ms is not None else None,
+        "rows_affected": run.rows_affected,
+        "result": run.result,
+        "error": run.error,
+    }
+
+
+@job("mark_absent", "Mark Absent Employees Daily", hour=10, minute=45)
+def mark_absent_daily():
+    """Mark employees without a check-in as absent, unless today is a Sunday or a holiday."""
+    now_ist = timezone.localtime(timezone.now(), IST)
+    today = now_ist.date()
+
+    if not is_working_day(today):
+        holiday = holiday_name(today)
+        return {"date": str(today), "skipped": f"holiday: {holiday}" if holiday else "sunday", "rows": 0}
+    if now_ist.time() < CHECK_IN_DEADLINE:
+        return {"date": str(today), "skipped": "before deadline", "rows": 0}
+
+    sweep = mark_absent_for_date(today)
+    return {"date": str(today), "employees": sweep.total, "rows": len(sweep.absent)}
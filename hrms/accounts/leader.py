@@ -0,0 +1,152 @@
+"""
+Leader election for the background scheduler.
+
+With SCHEDULER_MODE=leader every web process starts the scheduler paused and runs
+a LeaderElection thread. Exactly one process across all nodes holds the lock and
+resumes its scheduler; the others retry every LEADER_RETRY_INTERVAL seconds.
+
+On PostgreSQL the lock is a session-level pg_try_advisory_lock held on a dedicated
+connection, so it is released by the server as soon as the leader's process or
+connection dies and a follower takes over on its next attempt. Other databases
+(SQLite in development and tests) fall back to an exclusive lock on a local file,
+which only elects a leader among the processes of one host.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+
+class AdvisoryLock:
+    """PostgreSQL session advisory lock held on its own connection."""
+
+    def __init__(self, key):
+        self.key = key
+        self.connection = None
+
+    def acquire(self):
+        # Not Django's per-thread connection: the lock lives exactly as long as this one
+        connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [self.key])
+                acquired = cursor.fetchone()[0]
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        self.connection = connection
+        return True
+
+    def held(self):
+        """Check the lock's connection is still alive (the lock goes with it)."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except DatabaseError:
+            self.release()
+            return False
+
+    def release(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()  # ends the session, which releases the lock
+            except DatabaseError:
+                pass
+            self.connection = None
+
+
+class FileLock:
+    """Exclusive lock on a local file, for databases without advisory locks."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def acquire(self):
+        lock_file = open(self.path, "a+")
+        try:
+            try:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except ImportError:  # Windows
+                import msvcrt
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self.file = lock_file
+        return True
+
+    def held(self):
+        return self.file is not None
+
+    def release(self):
+        if self.file is not None:
+            self.file.close()  # closing the file drops the lock
+            self.file = None
+
+
+def make_lock():
+    if connections[DEFAULT_DB_ALIAS].vendor == "postgresql":
+        return AdvisoryLock(settings.LEADER_LOCK_ID)
+    return FileLock(settings.LEADER_LOCK_FILE)
+
+
+class LeaderElection:
+    """
+    Background thread that keeps trying to become leader. on_elected() is called when
+    this process takes the lock and on_deposed() when it loses it.
+    """
+
+    def __init__(self, on_elected, on_deposed, interval=None):
+        self.on_elected = on_elected
+        self.on_deposed = on_deposed
+        self.interval = interval if interval is not None else settings.LEADER_RETRY_INTERVAL
+        self.lock = make_lock()
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="leader-election", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+        if self.is_leader:
+            self._depose()
+        self.lock.release()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.is_leader:
+                    if not self.lock.held():
+                        logger.warning("Lost scheduler leadership")
+                        self._depose()
+                elif self.lock.acquire():
+                    self.is_leader = True
+                    logger.info("Elected scheduler leader")
+                    self.on_elected()
+            except Exception as e:
+                logger.error(f"Leader election failed: {e}")
+                if self.is_leader:
+                    self._depose()
+                self.lock.release()
+            self._stop.wait(self.interval)
+
+    def _depose(self):
+        self.is_leader = False
+        try:
+            self.on_deposed()
+        except Exception as e:
+            logger.error(f"Could not stop scheduled jobs after losing leadership: {e}")
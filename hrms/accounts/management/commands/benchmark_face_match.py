@@ -0,0 +1,195 @@
+"""
+Django management command to benchmark the face check-in pipeline against synthetic rosters.
+
+Runs fully offline: rosters are random 128-d encodings built in memory (no database
+rows, no MinIO) and probe images are read from a local directory instead of the
+bucket. Without --images, synthetic noise images are generated, which exercises
+decode and detection but finds no faces, so the encode stage is skipped.
+
+Stages timed per probe:
+    decode   in-memory decode, EXIF rotation and downscale (prepare_image)
+    quality  pre-detection quality gate (brightness, contrast, blur)
+    detect   face_recognition.face_locations on the prepared image
+    encode   face_recognition.face_encodings for the detected faces
+    match    FaceMatcher.best_match against a roster of each size
+    pool     detect_faces through the process pool, with all probes in flight at once
+
+Usage:
+    python manage.py benchmark_face_match
+    python manage.py benchmark_face_match --sizes 100,1000,10000,50000 --images ./faces --probes 200
+    python manage.py benchmark_face_match --skip-images --sizes 50000
+"""
+
+import os
+import time
+from io import BytesIO
+from concurrent.futures import as_completed
+
+import numpy as np
+from PIL import Image
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.face_matcher import FaceMatcher, DEFAULT_TOLERANCE
+from accounts.face_pool import quality_limits
+from accounts.face_preprocess import prepare_image
+from accounts.face_quality import check_frame, ImageRejected
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def synthetic_roster(size, samples_per_person, rng):
+    """(emails, centroids, samples, offsets, true encodings) for `size` random people."""
+    people = rng.normal(0, 0.09, (size, 128)).astype(np.float32)
+    samples = np.repeat(people, samples_per_person, axis=0)
+    samples += rng.normal(0, 0.02, samples.shape).astype(np.float32)
+    offsets = np.arange(0, size * samples_per_person + 1, samples_per_person, dtype=np.int64)
+    centroids = samples.reshape(size, samples_per_person, 128).mean(axis=1)
+    emails = [f"person{i}@example.com" for i in range(size)]
+    return emails, centroids, samples, offsets, people
+
+
+def synthetic_images(count, size, rng):
+    """JPEG bytes of random noise images, standing in for kiosk frames."""
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+        buffer = BytesIO()
+        Image.fromarray(pixels).save(buffer, "JPEG", quality=85)
+        images.append(buffer.getvalue())
+    return images
+
+
+def load_images(directory, count):
+    """Read up to `count` image files from a local directory (the offline stand-in for MinIO)."""
+    names = sorted(n for n in os.listdir(directory) if n.lower().endswith(IMAGE_EXTENSIONS))
+    if not names:
+        raise CommandError(f"No .jpg/.png images found in {directory}")
+    images = []
+    for i in range(count):
+        with open(os.path.join(directory, names[i % len(names)]), "rb") as f:
+            images.append(f.read())
+    return images
+
+
+class Command(BaseCommand):
+    help = 'Benchmark decode, detect, encode and match latency of face check-ins on synthetic rosters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000,50000', help='Comma separated roster sizes')
+        parser.add_argument('--probes', type=int, default=200, help='Match probes per roster size')
+        parser.add_argument('--samples-per-person', type=int, default=1, help='Reference samples per synthetic person')
+        parser.add_argument('--images', help='Directory of local probe images (default: synthetic noise images)')
+        parser.add_argument('--image-count', type=int, default=20, help='Images timed through decode/detect/encode')
+        parser.add_argument('--image-size', default='1280x960', help='Size of synthetic images, WxH')
+        parser.add_argument('--skip-images', action='store_true', help='Only benchmark matching')
+        parser.add_argument('--skip-pool', action='store_true', help='Do not benchmark the process pool')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        sizes = [int(s) for s in options['sizes'].split(',') if s.strip()]
+
+        self.stdout.write(f"Face match benchmark (tolerance {DEFAULT_TOLERANCE}, max image edge {settings.FACE_MAX_IMAGE_EDGE}px)")
+        self.stdout.write(f"{'stage':<22}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per sec':>11}")
+
+        if not options['skip_images']:
+            self.benchmark_images(options, rng)
+        for size in sizes:
+            self.benchmark_match(size, options['probes'], options['samples_per_person'], rng)
+
+    def report(self, stage, timings, wall=None):
+        """Print percentiles of per-item timings (seconds); throughput from wall time when given."""
+        timings = np.asarray(timings) * 1000
+        if not len(timings):
+            self.stdout.write(f"{stage:<22}{0:>7}{'-':>10}{'-':>10}{'-':>10}{'-':>11}")
+            return
+        p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+        throughput = len(timings) / wall if wall else 1000 / timings.mean()
+        self.stdout.write(f"{stage:<22}{len(timings):>7}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}{throughput:>11.1f}")
+
+    def benchmark_images(self, options, rng):
+        import face_recognition
+
+        count = options['image_count']
+        if options['images']:
+            images = load_images(options['images'], count)
+        else:
+            width, height = (int(v) for v in options['image_size'].lower().split('x'))
+            images = synthetic_images(count, (width, height), rng)
+
+        decode, quality, detect, encode = [], [], [], []
+        faces = rejected = 0
+        limits = quality_limits()
+        for image_bytes in images:
+            started = time.perf_counter()
+            prepared = prepare_image(image_bytes, settings.FACE_MAX_IMAGE_EDGE)
+            decode.append(time.perf_counter() - started)
+
+            if limits:
+                started = time.perf_counter()
+                try:
+                    check_frame(prepared, limits)
+                except ImageRejected:
+                    rejected += 1
+                quality.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            locations = face_recognition.face_locations(prepared.array)
+            detect.append(time.perf_counter() - started)
+
+            if locations:
+                faces += len(locations)
+                started = time.perf_counter()
+                face_recognition.face_encodings(prepared.array, known_face_locations=locations)
+                encode.append(time.perf_counter() - started)
+
+        self.report("decode", decode)
+        self.report("quality", quality)
+        self.report("detect", detect)
+        self.report("encode", encode)
+        self.stdout.write(f"  {faces} faces found in {len(images)} images, {rejected} would be rejected by the quality gate")
+
+        if not options['skip_pool']:
+            from accounts.face_pool import submit, max_pending, _detect_faces
+
+            # Warm the pool up so process start-up is not counted
+            submit(_detect_faces, images[0], settings.FACE_MAX_IMAGE_EDGE).result()
+            started = time.perf_counter()
+            submitted = {}
+            for image_bytes in images[:max_pending()]:
+                submitted[submit(_detect_faces, image_bytes, settings.FACE_MAX_IMAGE_EDGE)] = time.perf_counter()
+            latencies = []
+            for future in as_completed(submitted):
+                future.result()
+                latencies.append(time.perf_counter() - submitted[future])
+            wall = time.perf_counter() - started
+            self.report("pool (concurrent)", latencies, wall)
+
+    def benchmark_match(self, size, probes, samples_per_person, rng):
+        emails, centroids, samples, offsets, people = synthetic_roster(size, samples_per_person, rng)
+        matcher = FaceMatcher(emails, centroids, samples, offsets)
+
+        # Mostly enrolled people with fresh noise, plus some strangers
+        targets = rng.integers(0, size, probes)
+        probe_encodings = people[targets] + rng.normal(0, 0.02, (probes, 128)).astype(np.float32)
+        strangers = rng.random(probes) < 0.1
+        probe_encodings[strangers] = rng.normal(0, 0.09, (int(strangers.sum()), 128))
+
+        matcher.best_match(probe_encodings[0])  # warm-up
+        timings, hits = [], 0
+        for i, probe in enumerate(probe_encodings):
+            started = time.perf_counter()
+            match = matcher.best_match(probe)
+            timings.append(time.perf_counter() - started)
+            if match and not strangers[i] and match.email == emails[targets[i]]:
+                hits += 1
+        self.report(f"match {size}", timings)
+
+        started = time.perf_counter()
+        matcher.best_matches(probe_encodings)
+        wall = time.perf_counter() - started
+        self.report(f"match {size} batch", [wall / probes] * probes, wall)
+
+        enrolled = int((~strangers).sum())
+        self.stdout.write(f"  {hits}/{enrolled} enrolled probes matched correctly")
@@ -0,0 +1,148 @@
+"""
+Django management command to compute face embeddings for everyone who already has a profile picture.
+
+Profile pictures are downloaded concurrently over a pooled HTTP session, encoded in the
+face recognition process pool and written to FaceEmbedding in batches as they finish.
+The run is resumable: people whose stored embedding was computed from their current
+profile_picture URL are skipped, so an interrupted run can simply be started again.
+
+Usage:
+    python manage.py build_face_index
+    python manage.py build_face_index --force          # re-encode everyone
+    python manage.py build_face_index --workers 16 --batch-size 200
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.models import FaceEmbedding
+from accounts.face_embeddings import ROLE_MODELS, encoding_to_bytes
+from accounts.face_index import build_face_index
+from accounts.face_pool import encode_faces, FaceEngineBusy
+
+
+def iter_roster():
+    """Yield (email, profile_picture) for every person with a picture, streamed from all role tables."""
+    seen = set()
+    for model in ROLE_MODELS:
+        rows = (
+            model.objects.exclude(profile_picture__isnull=True)
+            .exclude(profile_picture="")
+            .values_list("email_id", "profile_picture")
+            .iterator(chunk_size=500)
+        )
+        for email, url in rows:
+            if email not in seen:
+                seen.add(email)
+                yield email, url
+
+
+class Command(BaseCommand):
+    help = 'Compute face embeddings for all existing profile pictures and rebuild the face index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-encode people whose embedding is already up to date')
+        parser.add_argument('--workers', type=int, default=0, help='Concurrent downloads (default: FACE_POOL_MAX_PENDING, at most 16)')
+        parser.add_argument('--batch-size', type=int, default=100, help='Embeddings written per database batch')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Per-image download timeout in seconds')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or min(16, settings.FACE_POOL_MAX_PENDING)
+        batch_size = options['batch_size']
+        timeout = options['timeout']
+
+        done = {} if options['force'] else dict(FaceEmbedding.objects.values_list("email_id", "source_url"))
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        def process(email, url):
+            response = session.get(url, timeout=timeout)
+            response.raise_for_status()
+            # Downloads outpace encoding; wait for a free slot instead of failing the person
+            while True:
+                try:
+                    encodings = encode_faces(response.content, check_quality=False)
+                    break
+                except FaceEngineBusy:
+                    time.sleep(0.05)
+            return encodings[0] if encodings else None
+
+        stats = {"encoded": 0, "skipped": 0, "no_face": 0, "failed": 0}
+        pending_rows, no_face_emails = [], []
+
+        def flush():
+            if pending_rows:
+                FaceEmbedding.objects.bulk_create(
+                    pending_rows,
+                    update_conflicts=True,
+                    unique_fields=["email"],
+                    update_fields=["encoding", "source_url", "updated_at"],
+                )
+                pending_rows.clear()
+            if no_face_emails:
+                FaceEmbedding.objects.filter(email_id__in=no_face_emails).delete()
+                no_face_emails.clear()
+
+        def collect(futures):
+            for future in futures:
+                email, url = in_flight.pop(future)
+                try:
+                    encoding = future.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    self.stdout.write(self.style.ERROR(f'  ❌ {email}: {e}'))
+                    continue
+                if encoding is None:
+                    stats["no_face"] += 1
+                    no_face_emails.append(email)
+                    self.stdout.write(self.style.WARNING(f'  ⚠ No face found for {email}'))
+                else:
+                    stats["encoded"] += 1
+                    pending_rows.append(FaceEmbedding(email_id=email, encoding=encoding_to_bytes(encoding), source_url=url))
+                if len(pending_rows) + len(no_face_emails) >= batch_size:
+                    flush()
+
+        self.stdout.write(f"Building face embeddings with {workers} download workers")
+        started = time.monotonic()
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for email, url in iter_roster():
+                if done.get(email) == url:
+                    stats["skipped"] += 1
+                    continue
+                # Keep a bounded window of work so the roster is streamed, not loaded up front
+                while len(in_flight) >= workers * 2:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                in_flight[executor.submit(process, email, url)] = (email, url)
+
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+        flush()
+
+        elapsed = time.monotonic() - started
+        processed = stats["encoded"] + stats["no_face"] + stats["failed"]
+        rate = processed / elapsed if elapsed else 0.0
+
+        count = build_face_index()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n✓ Processed {processed} profile pictures in {elapsed:.1f}s ({rate:.1f} images/s)'
+            )
+        )
+        self.stdout.write(f'  Encoded: {stats["encoded"]}')
+        self.stdout.write(f'  Up to date (skipped): {stats["skipped"]}')
+        self.stdout.write(f'  No face found: {stats["no_face"]}')
+        self.stdout.write(f'  Failed: {stats["failed"]}')
+        self.stdout.write(f'  Face index now holds {count} embeddings')
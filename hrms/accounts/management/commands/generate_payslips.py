@@ -0,0 +1,47 @@
+"""
+Django management command that generates a month's payslip PDFs in the foreground.
+
+Same work as POST /api/accounts/payslips/generate/, but the job runs in this process
+instead of on a thread of a web worker, so a deploy or worker restart can't cut it
+short. Progress is recorded on a PayslipJob as usual.
+
+Usage:
+    python manage.py generate_payslips --month 5 --year 2025
+    python manage.py generate_payslips --month May        # current year
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import Payroll, PayslipJob, month_number
+from accounts.payslips import active_payslip_job, generate_payslips
+
+
+class Command(BaseCommand):
+    help = "Generate payslip PDFs for all payrolls of a month"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', required=True, help='Month number or name')
+        parser.add_argument('--year', type=int, default=None, help='Year (default: current year)')
+
+    def handle(self, *args, **options):
+        month = month_number(options['month'])
+        if month is None:
+            raise CommandError(f"Invalid month {options['month']!r}")
+        year = options['year'] or timezone.now().year
+        period = year * 100 + month
+
+        if not Payroll.objects.filter(period=period).exists():
+            raise CommandError(f"No payrolls for {month}/{year}")
+        running = active_payslip_job(period)
+        if running:
+            raise CommandError(f"Payslips for {month}/{year} are already being generated (job {running.id})")
+
+        job = PayslipJob.objects.create(period=period)
+        self.stdout.write(f"Generating payslips for {month}/{year} (job {job.id})")
+        job = generate_payslips(job.id)
+        for email, error in job.errors.items():
+            self.stdout.write(self.style.WARNING(f'  {email}: {error}'))
+        if job.status == "failed":
+            raise CommandError(job.error or f"All {job.total} payslips failed")
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Generated {job.completed}/{job.total} payslips, {job.failed} failed'))
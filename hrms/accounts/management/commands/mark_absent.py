@@ -4,6 +4,7 @@ This command should be scheduled to run daily at 10:45 AM IST using a cron job o
 
 Usage:
     python manage.py mark_absent
+    python manage.py mark_absent --from 2025-01-01 --to 2025-01-31   # backfill missed days
 
 Cron job example (Linux):
     45 10 * * * cd /path/to/project && python manage.py mark_absent
@@ -15,11 +16,13 @@ Windows Task Scheduler:
     Trigger: Daily at 10:45 AM
 """
 
-from django.core.management.base import BaseCommand
+import time as clock
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from datetime import time
+from datetime import date, time, timedelta
 import pytz
-from accounts.models import Employee, Attendance, AbsentEmployeeDetails, Holiday
+from accounts.working_calendar import holiday_name
+from accounts.absence import mark_absent_for_date, mark_absent_for_range
 
 IST = pytz.timezone("Asia/Kolkata")
 
@@ -27,7 +30,14 @@ IST = pytz.timezone("Asia/Kolkata")
 class Command(BaseCommand):
     help = 'Mark employees as absent if they have not checked in by 10:45 AM IST'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, help='First day to backfill (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, help='Last day to backfill (default: the last day whose deadline has passed)')
+
     def handle(self, *args, **options):
+        if options['start'] or options['end']:
+            return self.backfill(options['start'], options['end'])
+
         now_ist = timezone.localtime(timezone.now(), IST)
         today = now_ist.date()
         current_time = now_ist.time()
@@ -46,12 +56,11 @@ class Command(BaseCommand):
             return
         
         # Check if today is a holiday
-        is_holiday = Holiday.objects.filter(date=today).exists()
-        if is_holiday:
-            holiday = Holiday.objects.get(date=today)
+        holiday = holiday_name(today)
+        if holiday:
             self.stdout.write(
                 self.style.WARNING(
-                    f'🎉 Today is a holiday: {holiday.name} - No absent marking needed!'
+                    f'🎉 Today is a holiday: {holiday} - No absent marking needed!'
                 )
             )
             return
@@ -67,53 +76,48 @@ class Command(BaseCommand):
             )
             return
         
-        # Get all active employees
-        all_employees = Employee.objects.all()
-        marked_absent_count = 0
-        absent_employees = []
-        
-        for emp in all_employees:
-            # Check if employee has checked in today
-            attendance_exists = Attendance.objects.filter(
-                email=emp.email,
-                date=today,
-                check_in__isnull=False
-            ).exists()
-            
-            if not attendance_exists:
-                # Check if already marked absent
-                already_absent = AbsentEmployeeDetails.objects.filter(
-                    email=emp.email,
-                    date=today
-                ).exists()
-                
-                if not already_absent:
-                    # Mark as absent
-                    AbsentEmployeeDetails.objects.create(
-                        email=emp.email,
-                        date=today
-                    )
-                    marked_absent_count += 1
-                    absent_employees.append({
-                        "email": emp.email.email,
-                        "fullname": emp.fullname,
-                        "department": emp.department
-                    })
-                    
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f'  ❌ Marked absent: {emp.fullname} ({emp.email.email}) - {emp.department}'
-                        )
-                    )
-        
+        # Employees with no check-in and no absent row, found and inserted in bulk
+        sweep = mark_absent_for_date(today)
+        marked_absent_count = len(sweep.absent)
+
+        for emp in sweep.absent:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'  ❌ Marked absent: {emp["fullname"]} ({emp["email"]}) - {emp["department"]}'
+                )
+            )
+
         # Summary
         self.stdout.write(
             self.style.SUCCESS(
                 f'\n✓ Successfully marked {marked_absent_count} employees as absent for {today}'
             )
         )
-        self.stdout.write(f'  Total employees checked: {all_employees.count()}')
-        self.stdout.write(f'  Present employees: {all_employees.count() - marked_absent_count}')
+        self.stdout.write(f'  Total employees checked: {sweep.total}')
+        self.stdout.write(f'  Present employees: {sweep.total - marked_absent_count}')
         
         if marked_absent_count == 0:
             self.stdout.write(self.style.SUCCESS('  🎉 All employees have checked in!'))
+
+    def backfill(self, start, end):
+        now_ist = timezone.localtime(timezone.now(), IST)
+        # Today only counts once its 10:45 deadline has passed
+        last_closed = now_ist.date() if now_ist.time() >= time(10, 45) else now_ist.date() - timedelta(days=1)
+        end = min(end or last_closed, last_closed)
+        if start is None:
+            raise CommandError('--from is required for a backfill')
+        if start > end:
+            raise CommandError(f'Nothing to backfill: {start} is after {end}')
+
+        self.stdout.write(f"Backfilling absent marking from {start} to {end}")
+        started = clock.monotonic()
+        marked = mark_absent_for_range(start, end)
+        elapsed = clock.monotonic() - started
+
+        for day, count in marked.items():
+            self.stdout.write(f'  {day} ({day.strftime("%A")}): {count} marked absent')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n✓ Marked {sum(marked.values())} absences over {len(marked)} working days in {elapsed:.1f}s'
+            )
+        )
@@ -0,0 +1,68 @@
+"""
+Django management command that processes asynchronous face check-in tickets.
+
+Pending tickets are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+workers (or hosts) can run side by side without processing a ticket twice. Each
+ticket runs the regular check-in code in a thread, which waits on the face
+recognition process pool, and the result is pushed to the matched users over FCM.
+
+Usage:
+    python manage.py process_checkin_tickets              # run until stopped
+    python manage.py process_checkin_tickets --once       # drain the queue and exit
+    python manage.py process_checkin_tickets --threads 8 --poll-interval 0.5
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.checkin_tickets import claim_tickets, process_ticket, purge_finished_tickets
+
+PURGE_INTERVAL = 3600  # seconds
+
+
+def _process(ticket):
+    try:
+        return process_ticket(ticket)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Process queued asynchronous face check-in tickets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when no pending tickets are left')
+        parser.add_argument('--threads', type=int, default=0, help='Tickets processed in parallel (default: CPU count)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        threads = options['threads'] or os.cpu_count() or 1
+        self.stdout.write(f"Processing check-in tickets with {threads} threads")
+
+        processed = 0
+        last_purge = 0.0
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            while True:
+                tickets = claim_tickets(threads)
+                if tickets:
+                    for ticket, status in zip(tickets, executor.map(_process, tickets)):
+                        processed += 1
+                        self.stdout.write(f'  Ticket {ticket.id} ({ticket.kind}): {status}')
+                    continue
+
+                if time.monotonic() - last_purge >= PURGE_INTERVAL:
+                    last_purge = time.monotonic()
+                    purged = purge_finished_tickets()
+                    if purged:
+                        self.stdout.write(f'  Purged {purged} finished tickets')
+
+                if options['once']:
+                    break
+                close_old_connections()
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Processed {processed} check-in tickets'))
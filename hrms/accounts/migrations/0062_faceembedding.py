@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-16 22:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0061_alter_fcmtoken_email_pettycash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceEmbedding',
+            fields=[
+                ('email', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='face_embedding', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('encoding', models.BinaryField()),
+                ('source_url', models.URLField(blank=True, max_length=500, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Face Embedding',
+                'verbose_name_plural': 'Face Embeddings',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0062_faceembedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceSample',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('encoding', models.BinaryField()),
+                ('source', models.CharField(choices=[('upload', 'Upload'), ('checkin', 'Check-in')], default='upload', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('email', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='face_samples', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Face Sample',
+                'verbose_name_plural': 'Face Samples',
+                'indexes': [models.Index(fields=['email', 'created_at'], name='accounts_fa_email_i_0d58a8_idx')],
+            },
+        ),
+    ]
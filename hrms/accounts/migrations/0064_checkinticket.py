@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:14
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0063_facesample'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckInTicket',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('office', 'Office'), ('work', 'Work from home')], max_length=10)),
+                ('batch', models.BooleanField(default=False)),
+                ('image', models.BinaryField()),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('submitted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=12)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('http_status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Check-in Ticket',
+                'verbose_name_plural': 'Check-in Tickets',
+                'indexes': [models.Index(fields=['status', 'submitted_at'], name='accounts_ch_status_92758b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0064_checkinticket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfficeSite',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('radius_meters', models.PositiveIntegerField(default=1000)),
+                ('face_partition', models.CharField(blank=True, default='', max_length=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Office Site',
+                'verbose_name_plural': 'Office Sites',
+            },
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='site',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendances', to='accounts.officesite'),
+        ),
+    ]
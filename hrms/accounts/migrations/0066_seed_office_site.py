@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# The office the geofence used to hard-code (OFFICE_LAT / OFFICE_LON, 1000 m)
+HEAD_OFFICE = {
+    'name': 'Head Office',
+    'latitude': 13.068906816007116,
+    'longitude': 77.55541294505542,
+    'radius_meters': 1000,
+    'face_partition': 'Bangalore',
+}
+
+
+def seed_office_site(apps, schema_editor):
+    OfficeSite = apps.get_model('accounts', 'OfficeSite')
+    if not OfficeSite.objects.exists():
+        OfficeSite.objects.create(**HEAD_OFFICE)
+
+
+def remove_office_site(apps, schema_editor):
+    OfficeSite = apps.get_model('accounts', 'OfficeSite')
+    OfficeSite.objects.filter(name=HEAD_OFFICE['name']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0065_officesite'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_office_site, remove_office_site),
+    ]
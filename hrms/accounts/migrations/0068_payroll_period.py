@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0067_jobrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payroll',
+            name='period',
+            field=models.IntegerField(blank=True, editable=False, help_text='yyyymm, derived from month and year', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='payroll',
+            index=models.Index(fields=['email', 'period'], name='accounts_pa_email_i_c1eb2c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payroll',
+            index=models.Index(fields=['period'], name='accounts_pa_period_df28e1_idx'),
+        ),
+    ]
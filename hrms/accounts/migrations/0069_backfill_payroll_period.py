@@ -0,0 +1,43 @@
+import calendar
+
+from django.db import migrations
+
+
+def month_number(month):
+    # Copy of accounts.models.month_number: migrations can't rely on the live module
+    value = str(month).strip()
+    if value.isdigit():
+        number = int(value)
+        return number if 1 <= number <= 12 else None
+    value = value.lower()
+    for number in range(1, 13):
+        # "Sep", "Sept" and "September" all read as 9
+        if len(value) >= 3 and calendar.month_name[number].lower().startswith(value):
+            return number
+    return None
+
+
+def backfill_period(apps, schema_editor):
+    Payroll = apps.get_model('accounts', 'Payroll')
+    batch = []
+    for payroll in Payroll.objects.only('id', 'month', 'year').iterator(chunk_size=2000):
+        number = month_number(payroll.month)
+        if number is None or payroll.year is None:
+            continue
+        payroll.period = payroll.year * 100 + number
+        batch.append(payroll)
+        if len(batch) >= 2000:
+            Payroll.objects.bulk_update(batch, ['period'])
+            batch = []
+    Payroll.objects.bulk_update(batch, ['period'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0068_payroll_period'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_period, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:45
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0069_backfill_payroll_period'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayslipJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('period', models.IntegerField(help_text='yyyymm of the payrolls')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('total', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=dict, help_text='email -> error for payslips that failed')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Payslip Job',
+                'verbose_name_plural': 'Payslip Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='payslip_url',
+            field=models.URLField(blank=True, max_length=500, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0070_payslipjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkinticket',
+            name='not_before',
+            field=models.DateTimeField(blank=True, help_text='Retry backoff: not claimed again before this time', null=True),
+        ),
+    ]
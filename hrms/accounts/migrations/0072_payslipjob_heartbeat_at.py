@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0071_checkinticket_not_before'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payslipjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='last progress save while running', null=True),
+        ),
+    ]
@@ -1,3 +1,6 @@
+import uuid
+import calendar
+
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.utils import timezone
@@ -207,6 +210,28 @@ class Award(models.Model):
 
 
 # ------------------- ATTENDANCE, LEAVE, PAYROLL -------------------
+class OfficeSite(models.Model):
+    """
+    Office location for the check-in geofence. face_partition is the face index
+    partition (work location) searched first for check-ins at this site.
+    """
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=100, unique=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    radius_meters = models.PositiveIntegerField(default=1000)
+    face_partition = models.CharField(max_length=100, blank=True, default='')
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Office Site"
+        verbose_name_plural = "Office Sites"
+
+    def __str__(self):
+        return f"{self.name} ({self.radius_meters}m)"
+
+
 class Attendance(models.Model):
     LOCATION_TYPE_CHOICES = [
         ('office', 'Office'),
@@ -222,6 +247,7 @@ class Attendance(models.Model):
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
     location_type = models.CharField(max_length=10, choices=LOCATION_TYPE_CHOICES, default='office')
+    site = models.ForeignKey(OfficeSite, on_delete=models.SET_NULL, null=True, blank=True, related_name='attendances')
 
     CHECK_IN_DEADLINE = time(10, 45)  # 10:45 AM
 
@@ -270,6 +296,28 @@ class Leave(models.Model):
         return f"{self.email.email} Leave from {self.start_date} to {self.end_date} [{self.status}]"
 
 
+def month_number(month):
+    """1-12 from a month given as a number ("5", "05", 5) or a name ("May", "september"); None if unknown."""
+    value = str(month).strip()
+    if value.isdigit():
+        number = int(value)
+        return number if 1 <= number <= 12 else None
+    value = value.lower()
+    for number in range(1, 13):
+        # "Sep", "Sept" and "September" all read as 9
+        if len(value) >= 3 and calendar.month_name[number].lower().startswith(value):
+            return number
+    return None
+
+
+def payroll_period(month, year):
+    """yyyymm for a payroll's month and year, or None when the month can't be read."""
+    number = month_number(month)
+    if number is None or year is None:
+        return None
+    return int(year) * 100 + number
+
+
 class Payroll(models.Model):
     id = models.AutoField(primary_key=True)
     email = models.ForeignKey(User, on_delete=models.CASCADE, to_field='email')
@@ -279,6 +327,8 @@ class Payroll(models.Model):
     year = models.IntegerField(default=timezone.now().year)
     STD = models.IntegerField(default=0, help_text="Number of standard working days in the month")
     LOP = models.IntegerField(default=0, help_text="Loss of pay days (unpaid leave)")
+    period = models.IntegerField(null=True, blank=True, editable=False, help_text="yyyymm, derived from month and year")
+    payslip_url = models.URLField(max_length=500, null=True, blank=True)
 
     status = models.CharField(
         max_length=20,
@@ -289,6 +339,16 @@ class Payroll(models.Model):
     class Meta:
         ordering = ['-pay_date']
         unique_together = ('email', 'month', 'year')
+        indexes = [
+            models.Index(fields=['email', 'period']),
+            models.Index(fields=['period']),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.period = payroll_period(self.month, self.year)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'period'}
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         return f"Payroll for {self.email.email} - {self.month} {self.year}"
@@ -762,3 +822,160 @@ class FCMToken(models.Model):
     
     def __str__(self):
         return f"FCM Token for {self.email.email} ({self.device_type})"
+
+
+class FaceEmbedding(models.Model):
+    """
+    Stored 128-d face encoding of a user's profile picture.
+    Computed once when the picture is uploaded so attendance check-ins
+    only compare against stored vectors instead of re-downloading photos.
+    """
+    email = models.OneToOneField(User, on_delete=models.CASCADE, to_field='email', primary_key=True, related_name='face_embedding')
+    encoding = models.BinaryField()
+    source_url = models.URLField(max_length=500, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Face Embedding"
+        verbose_name_plural = "Face Embeddings"
+
+    def __str__(self):
+        return f"Face embedding for {self.email_id}"
+
+
+class FaceSample(models.Model):
+    """
+    Additional reference encoding for a user, on top of the profile picture embedding.
+    Added explicitly or learned from confident check-ins; the number kept per person
+    is capped by FACE_MAX_SAMPLES_PER_PERSON.
+    """
+    SOURCE_CHOICES = [
+        ('upload', 'Upload'),
+        ('checkin', 'Check-in'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    email = models.ForeignKey(User, on_delete=models.CASCADE, to_field='email', related_name='face_samples')
+    encoding = models.BinaryField()
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Face Sample"
+        verbose_name_plural = "Face Samples"
+        indexes = [
+            models.Index(fields=['email', 'created_at'])
+        ]
+
+    def __str__(self):
+        return f"Face sample for {self.email_id} ({self.source})"
+
+
+class CheckInTicket(models.Model):
+    """
+    Face check-in submitted in async mode. The endpoint stores the image and returns
+    the ticket id at once; process_checkin_tickets runs the match and records the
+    endpoint's response in result, using submitted_at as the check-in time.
+    """
+    KIND_CHOICES = [
+        ('office', 'Office'),
+        ('work', 'Work from home'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    batch = models.BooleanField(default=False)
+    image = models.BinaryField()
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    submitted_at = models.DateTimeField(default=timezone.now)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    not_before = models.DateTimeField(null=True, blank=True, help_text="Retry backoff: not claimed again before this time")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    http_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Check-in Ticket"
+        verbose_name_plural = "Check-in Tickets"
+        indexes = [
+            models.Index(fields=['status', 'submitted_at'])
+        ]
+
+    def __str__(self):
+        return f"{self.kind} check-in {self.id} ({self.status})"
+
+
+class JobRun(models.Model):
+    """One execution of a registered background job (see accounts/jobs.py)."""
+    TRIGGER_CHOICES = [
+        ('schedule', 'Schedule'),
+        ('manual', 'Manual'),
+    ]
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('success', 'Success'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    job = models.CharField(max_length=100)
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES, default='schedule')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    host = models.CharField(max_length=255, blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.FloatField(null=True, blank=True)
+    rows_affected = models.IntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Job Run"
+        verbose_name_plural = "Job Runs"
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['job', '-started_at'])
+        ]
+
+    def __str__(self):
+        return f"{self.job} at {self.started_at} ({self.status})"
+
+
+class PayslipJob(models.Model):
+    """Payslip PDF generation for one month's payrolls (see accounts/payslips.py)."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    period = models.IntegerField(help_text="yyyymm of the payrolls")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    errors = models.JSONField(default=dict, blank=True, help_text="email -> error for payslips that failed")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="last progress save while running")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Payslip Job"
+        verbose_name_plural = "Payslip Jobs"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Payslips {self.period} [{self.status}]"
@@ -0,0 +1,238 @@
+"""
+Monthly payroll runs.
+
+run_payroll creates the Payroll rows of every employee for one month in a single
+transaction: LOP for everyone comes from one query (see LopMonth), the basic salary
+is carried over from each employee's latest payroll in the same roster query, and
+the rows are bulk-inserted, skipping people who already have a payroll for the month.
+
+LOP counts the working days (Monday-Saturday, not a holiday) on which an employee was
+on approved unpaid leave, or marked absent without any approved leave covering the
+day, minus days an approved attendance correction turned into present. Leave, absent
+rows and corrections of the month are fetched as a single UNION query with leave
+already clipped to the month, then laid out as per-day boolean arrays and combined
+with the working-day calendar in NumPy, so overlapping leave and absence count once.
+"""
+import time
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import DateField, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Greatest, Least
+
+from .models import Employee, Leave, AbsentEmployeeDetails, RaiseRequestAttendance, Payroll, month_number
+from .working_calendar import get_calendar, working_days_between, working_mask
+
+UNPAID_LEAVE, ON_LEAVE, ABSENT, CORRECTED = range(4)
+KINDS = ("unpaid_leave", "on_leave", "absent", "corrected")
+
+
+def parse_month(month, year):
+    """
+    (month, year) as ints, the month given as a number or a name like Payroll.month
+    ("5", "05", "May"); raises ValueError for an unknown month or year.
+    """
+    number = month_number(month)
+    if number is None:
+        raise ValueError(f"Invalid month {month!r}, expected 1-12 or a month name")
+    try:
+        return number, int(year)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid year {year!r}")
+
+
+def month_bounds(month, year):
+    """First and last day of a month."""
+    month, year = parse_month(month, year)
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def parse_period(value):
+    """yyyymm from "202405", "2024-05" or "2024-5"; raises ValueError otherwise."""
+    value = str(value).strip()
+    if "-" in value:
+        year, month = value.split("-", 1)
+        year, month = int(year), int(month)
+    else:
+        if len(value) != 6 or not value.isdigit():
+            raise ValueError(f"Invalid period {value!r}, expected yyyymm or yyyy-mm")
+        year, month = int(value[:4]), int(value[4:])
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid period {value!r}, month must be 1-12")
+    return year * 100 + month
+
+
+def filter_by_period(payrolls, params):
+    """Apply the optional from/to (yyyymm or yyyy-mm, both inclusive) query parameters."""
+    if params.get("from"):
+        payrolls = payrolls.filter(period__gte=parse_period(params["from"]))
+    if params.get("to"):
+        payrolls = payrolls.filter(period__lte=parse_period(params["to"]))
+    return payrolls
+
+
+def _lop_rows(first_day, last_day, emails=None):
+    """
+    Single UNION query over everything that affects LOP in first_day..last_day:
+    (email, start, end, kind) for approved unpaid leave, approved leave of any
+    paid_status (which excuses an absent row), absent days and approved attendance
+    corrections.
+    """
+    def kind(value):
+        return Value(value, output_field=IntegerField())
+
+    def leave(kind_value, **filters):
+        return Leave.objects.filter(
+            status="Approved", start_date__lte=last_day, end_date__gte=first_day, **filters,
+        ).annotate(
+            start=Greatest(F("start_date"), Value(first_day, output_field=DateField())),
+            end=Least(F("end_date"), Value(last_day, output_field=DateField())),
+            kind=kind(kind_value),
+        )
+
+    unpaid = leave(UNPAID_LEAVE, paid_status="Unpaid")
+    on_leave = leave(ON_LEAVE)
+    absent = AbsentEmployeeDetails.objects.filter(date__range=(first_day, last_day)).annotate(
+        start=F("date"), end=F("date"), kind=kind(ABSENT),
+    )
+    corrected = RaiseRequestAttendance.objects.filter(status="Approved", date__range=(first_day, last_day)).annotate(
+        start=F("date"), end=F("date"), kind=kind(CORRECTED),
+    )
+    querysets = [unpaid, on_leave, absent, corrected]
+    if emails is not None:
+        querysets = [qs.filter(email_id__in=emails) for qs in querysets]
+    first, *rest = [qs.order_by().values_list("email_id", "start", "end", "kind") for qs in querysets]
+    return first.union(*rest, all=True)
+
+
+class LopMonth:
+    """
+    Per-day LOP of one month for all employees (or the given emails), loaded with one
+    query. A day is LOP when it is a working day, the employee was on approved unpaid
+    leave or marked absent while not on approved leave, and no approved attendance
+    correction covers it.
+    """
+
+    def __init__(self, month, year, emails=None):
+        self.month, self.year = parse_month(month, year)
+        self.first_day, self.last_day = month_bounds(self.month, self.year)
+        self.days = [self.first_day + timedelta(days=i) for i in range((self.last_day - self.first_day).days + 1)]
+        self.working = working_mask(self.first_day, self.last_day)
+
+        rows = list(_lop_rows(self.first_day, self.last_day, emails))
+        self.emails = sorted({row[0] for row in rows})
+        index = {email: i for i, email in enumerate(self.emails)}
+        # marks[kind, employee, day]
+        self.marks = np.zeros((len(KINDS), len(self.emails), len(self.days)), dtype=bool)
+        for email, start, end, kind in rows:
+            self.marks[kind, index[email], (start - self.first_day).days:(end - self.first_day).days + 1] = True
+
+        absent = self.marks[ABSENT] & ~self.marks[ON_LEAVE]
+        self.lop = (self.marks[UNPAID_LEAVE] | absent) & ~self.marks[CORRECTED] & self.working
+
+    def totals(self):
+        """{email: LOP days} for employees with at least one LOP day."""
+        return {email: int(days) for email, days in zip(self.emails, self.lop.sum(axis=1)) if days}
+
+    def breakdown(self, email):
+        """One dict per day of the month for email, saying why it is or is not LOP."""
+        row = self.emails.index(email) if email in self.emails else None
+        holidays = get_calendar(self.year).holidays
+        result = []
+        for i, day in enumerate(self.days):
+            entry = {
+                "date": str(day),
+                "weekday": day.strftime("%A"),
+                "working_day": bool(self.working[i]),
+                "holiday": holidays.get(day),
+            }
+            for kind, name in enumerate(KINDS):
+                entry[name] = bool(self.marks[kind, row, i]) if row is not None else False
+            entry["lop"] = bool(self.lop[row, i]) if row is not None else False
+            result.append(entry)
+        return result
+
+
+def lop_days_for_month(month, year, emails=None):
+    """{email: LOP days} for the month; employees without LOP are left out."""
+    return LopMonth(month, year, emails).totals()
+
+
+def explain_lop(email, month, year):
+    """LOP of one employee for the month with its per-day breakdown."""
+    lop_month = LopMonth(month, year, emails=[email])
+    days = lop_month.breakdown(email)
+    return {
+        "email": email,
+        "month": lop_month.month,
+        "year": lop_month.year,
+        "STD": int(lop_month.working.sum()),
+        "LOP": sum(day["lop"] for day in days),
+        "days": days,
+    }
+
+
+def run_payroll(month, year, salaries=None, status="Pending"):
+    """
+    Create the month's Payroll rows for every employee who joined by the end of it.
+    salaries optionally maps email to basic salary; others keep their latest basic
+    salary (0 for a first payroll). Returns a summary dict.
+    """
+    started = time.perf_counter()
+    month, year = parse_month(month, year)
+    first_day, last_day = month_bounds(month, year)
+    period = year * 100 + month  # bulk_create skips Payroll.save()
+    salaries = salaries or {}
+    std = working_days_between(first_day, last_day)
+
+    latest_salary = (
+        Payroll.objects.filter(email_id=OuterRef("email_id"))
+        .order_by("-year", "-pay_date")
+        .values("basic_salary")[:1]
+    )
+    roster = (
+        Employee.objects.exclude(date_joined__gt=last_day)
+        .annotate(latest_salary=Subquery(latest_salary))
+        .values_list("email_id", "latest_salary")
+    )
+
+    with transaction.atomic():
+        # create_payroll stores month as sent ("5", "05", "May"), period reads them all alike
+        this_month = Payroll.objects.filter(period=period)
+        existing = set(this_month.values_list("email_id", flat=True))
+        lop = lop_days_for_month(month, year)
+
+        rows, skipped = [], 0
+        for email, latest in roster.iterator(chunk_size=2000):
+            if email in existing:
+                skipped += 1
+                continue
+            rows.append(Payroll(
+                email_id=email,
+                basic_salary=Decimal(str(salaries.get(email, latest or 0))),
+                month=str(month),
+                year=year,
+                period=period,
+                STD=std,
+                LOP=lop.get(email, 0),
+                status=status,
+            ))
+        # ignore_conflicts: a concurrent create_payroll for the same person wins
+        Payroll.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+        created = set(this_month.values_list("email_id", flat=True)) - existing
+        skipped += len(rows) - len(created)
+        rows = [row for row in rows if row.email_id in created]
+
+    return {
+        "month": month,
+        "year": year,
+        "STD": std,
+        "created": len(rows),
+        "skipped_existing": skipped,
+        "employees_with_lop": sum(1 for row in rows if row.LOP),
+        "total_lop_days": sum(row.LOP for row in rows),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
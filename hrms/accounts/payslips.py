@@ -0,0 +1,243 @@
+"""
+Batch payslip PDFs.
+
+A PayslipJob covers every payroll of one period. generate_payslips compiles the
+payslip template once and renders it per employee in this process, turns the HTML
+into PDFs on a process pool, and uploads each PDF to MinIO as soon as it comes back,
+from a few threads sharing one boto3 client. Payroll.payslip_url and the job's
+counters are saved in batches while it runs, so the status endpoint shows progress.
+
+Jobs started from the API run on a thread of the web process; a job whose process
+died shows no progress (heartbeat_at) for PAYSLIP_JOB_STALE_AFTER seconds and is then
+marked failed, so the month can be started again. The generate_payslips management
+command runs a job in the foreground instead.
+"""
+import os
+import logging
+import calendar
+import threading
+import traceback
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+import boto3
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import Payroll, PayslipJob
+from .pdf_render import html_to_pdf, render_pool
+
+logger = logging.getLogger(__name__)
+
+COMPANY_NAME = "Global Tech Software Solutions"
+SAVE_EVERY = 50  # finished payslips between progress saves
+
+_client_lock = threading.Lock()
+_client = None
+
+
+def s3_client():
+    """MinIO client shared by the upload threads (boto3 clients are thread-safe)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            minio_conf = settings.MINIO_STORAGE
+            protocol = "https" if minio_conf.get("USE_SSL", False) else "http"
+            _client = boto3.client(
+                "s3",
+                endpoint_url=f"{protocol}://{minio_conf['ENDPOINT']}",
+                aws_access_key_id=minio_conf["ACCESS_KEY"],
+                aws_secret_access_key=minio_conf["SECRET_KEY"],
+            )
+        return _client
+
+
+def payslip_amounts(basic_salary, std, lop):
+    """(LOP deduction, net pay): basic salary less one day's pay per LOP day."""
+    basic = Decimal(basic_salary)
+    per_day = basic / std if std else Decimal(0)
+    deduction = min(basic, per_day * lop).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return deduction, basic - deduction
+
+
+def payslip_key(email, period):
+    folder_name = email.split("@")[0].lower()
+    return f"documents/{folder_name}/payslip_{period}.pdf"
+
+
+def _payslip_rows(period):
+    return (
+        Payroll.objects.filter(period=period)
+        .order_by("email_id")
+        .values(
+            "id", "email_id", "basic_salary", "STD", "LOP", "year", "pay_date",
+            "email__employee__fullname", "email__employee__designation", "email__employee__department",
+        )
+    )
+
+
+def _context(row, period):
+    deduction, net_pay = payslip_amounts(row["basic_salary"], row["STD"], row["LOP"])
+    return {
+        "company_name": COMPANY_NAME,
+        "logo_url": getattr(settings, "LOGO_URL", ""),
+        "employee_name": row["email__employee__fullname"] or row["email_id"],
+        "email": row["email_id"],
+        "designation": row["email__employee__designation"] or "Employee",
+        "department": row["email__employee__department"] or "N/A",
+        "month_name": calendar.month_name[period % 100],
+        "year": period // 100,
+        "pay_date": row["pay_date"].strftime("%d-%m-%Y"),
+        "std": row["STD"],
+        "lop": row["LOP"],
+        "days_paid": max(row["STD"] - row["LOP"], 0),
+        "basic_salary": f"{row['basic_salary']:,.2f}",
+        "lop_deduction": f"{deduction:,.2f}",
+        "net_pay": f"{net_pay:,.2f}",
+    }
+
+
+def _upload(client, key, pdf):
+    client.put_object(Bucket=settings.MINIO_STORAGE["BUCKET_NAME"], Key=key, Body=pdf, ContentType="application/pdf")
+    return f"{settings.BASE_BUCKET_URL}{key}"
+
+
+class _Progress:
+    """Collects finished payslips and saves URLs and job counters every SAVE_EVERY."""
+
+    def __init__(self, job):
+        self.job = job
+        self.urls = {}  # payroll id -> url, not saved yet
+
+    def succeeded(self, payroll_id, url):
+        self.urls[payroll_id] = url
+        self.job.completed += 1
+        self._maybe_save()
+
+    def failed(self, email, error):
+        self.job.errors[email] = error
+        self.job.failed += 1
+        self._maybe_save()
+
+    def _maybe_save(self):
+        if (self.job.completed + self.job.failed) % SAVE_EVERY == 0:
+            self.save()
+
+    def save(self):
+        Payroll.objects.bulk_update(
+            [Payroll(id=payroll_id, payslip_url=url) for payroll_id, url in self.urls.items()], ["payslip_url"]
+        )
+        self.urls = {}
+        self.job.heartbeat_at = timezone.now()
+        self.job.save(update_fields=["completed", "failed", "errors", "heartbeat_at"])
+
+
+def generate_payslips(job_id):
+    """Render and upload the payslips of a PayslipJob, recording progress on it."""
+    close_old_connections()
+    job = PayslipJob.objects.get(id=job_id)
+    job.status = "running"
+    job.started_at = job.heartbeat_at = timezone.now()
+    job.save(update_fields=["status", "started_at", "heartbeat_at"])
+    try:
+        rows = list(_payslip_rows(job.period))
+        job.total = len(rows)
+        job.heartbeat_at = timezone.now()
+        job.save(update_fields=["total", "heartbeat_at"])
+
+        template = get_template("payslips/payslip.html")
+        client = s3_client()
+        progress = _Progress(job)
+        workers = settings.PAYSLIP_POOL_WORKERS or os.cpu_count() or 1
+        uploads = {}  # upload future -> payroll row
+
+        def finish_upload(future):
+            row = uploads.pop(future)
+            try:
+                progress.succeeded(row["id"], future.result())
+            except Exception as e:
+                progress.failed(row["email_id"], f"Upload failed: {e}")
+
+        with render_pool(workers) as renderer, ThreadPoolExecutor(settings.PAYSLIP_UPLOAD_THREADS) as uploader:
+            renders = {renderer.submit(html_to_pdf, template.render(_context(row, job.period))): row for row in rows}
+            for future in as_completed(renders):
+                row = renders[future]
+                try:
+                    pdf = future.result()
+                except Exception as e:
+                    progress.failed(row["email_id"], str(e))
+                else:
+                    key = payslip_key(row["email_id"], job.period)
+                    uploads[uploader.submit(_upload, client, key, pdf)] = row
+                for done in [upload for upload in uploads if upload.done()]:
+                    finish_upload(done)
+            wait(list(uploads))
+            for done in list(uploads):
+                finish_upload(done)
+
+        progress.save()
+        job.status = "failed" if job.total and job.failed == job.total else "done"
+    except Exception as e:
+        logger.error(f"Payslip job {job_id} failed: {e}")
+        job.status = "failed"
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "finished_at"])
+    logger.info(f"Payslip job {job_id} {job.status}: {job.completed}/{job.total} generated, {job.failed} failed")
+    close_old_connections()
+    return job
+
+
+def fail_stale_jobs(period=None):
+    """
+    Mark pending/running jobs without progress for PAYSLIP_JOB_STALE_AFTER seconds as
+    failed, e.g. after the worker running them was restarted. Returns how many.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.PAYSLIP_JOB_STALE_AFTER)
+    stale = PayslipJob.objects.filter(status__in=["pending", "running"], created_at__lt=cutoff).filter(
+        Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=cutoff)
+    )
+    if period is not None:
+        stale = stale.filter(period=period)
+    count = stale.update(
+        status="failed",
+        error=f"No progress for {settings.PAYSLIP_JOB_STALE_AFTER} seconds; the process running it stopped",
+        finished_at=timezone.now(),
+    )
+    if count:
+        logger.warning(f"Marked {count} stale payslip job(s) as failed")
+    return count
+
+
+def active_payslip_job(period):
+    """The pending or running job for period that is still making progress, or None."""
+    fail_stale_jobs(period)
+    return PayslipJob.objects.filter(period=period, status__in=["pending", "running"]).first()
+
+
+def start_payslip_job(period):
+    """Create a PayslipJob for period and run it on a background thread."""
+    job = PayslipJob.objects.create(period=period)
+    threading.Thread(target=generate_payslips, args=(job.id,), name=f"payslips-{period}", daemon=True).start()
+    return job
+
+
+def payslip_job_payload(job):
+    return {
+        "job_id": str(job.id),
+        "period": job.period,
+        "status": job.status,
+        "total": job.total,
+        "completed": job.completed,
+        "failed": job.failed,
+        "errors": job.errors,
+        "error": job.error or None,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "heartbeat_at": job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,31 @@
+"""
+HTML to PDF rendering for process pools.
+
+xhtml2pdf is pure Python and holds the GIL for the seconds a document can take, so
+batch rendering runs in pool processes. This module imports nothing from the app's
+models, so spawned processes can import it without setting up Django.
+"""
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+
+class PdfRenderError(Exception):
+    """Raised when xhtml2pdf reports errors for a document."""
+
+
+def html_to_pdf(html):
+    """Render an HTML document to PDF bytes."""
+    from xhtml2pdf import pisa
+
+    buffer = BytesIO()
+    result = pisa.CreatePDF(html, dest=buffer, encoding="UTF-8")
+    if result.err:
+        raise PdfRenderError(f"PDF generation failed with {result.err} error(s)")
+    return buffer.getvalue()
+
+
+def render_pool(workers):
+    """Process pool for one batch of documents; use it as a context manager."""
+    # spawn keeps pool processes free of the parent's DB connections and threads
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
@@ -1,6 +1,6 @@
 """
 Background Scheduler for HRMS
-Handles automated tasks like marking absent employees
+Runs the jobs registered in accounts/jobs.py, like marking absent employees
 """
 import logging
 from datetime import time
@@ -8,9 +8,13 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from django.utils import timezone
 from django.conf import settings
-from django.core.management import execute_from_command_line
 import os
 import sys
+import atexit
+
+from .leader import LeaderElection
+from .jobs import JOBS, run_job
+from .models import JobRun
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -18,37 +22,62 @@ logger = logging.getLogger(__name__)
 # IST timezone (UTC+5:30)
 IST = timezone.get_fixed_timezone(330)  # 5.5 hours = 330 minutes
 
-def mark_absent_employees_daily():
-    """
-    Wrapper function to call the mark_absent_employees management command
-    This is scheduled to run daily at 10:45 AM IST
-    """
-    try:
-        # Execute the management command
-        execute_from_command_line(['manage.py', 'mark_absent'])
-        logger.info("Daily absent marking task executed successfully")
-    except Exception as e:
-        logger.error(f"Error executing daily absent marking task: {str(e)}")
-
-def start_scheduler():
+def start_scheduler(paused=False):
     """Start the APScheduler for automated tasks"""
-    scheduler = BackgroundScheduler(timezone=IST)
-    
-    # Schedule the absent marking task for 10:45 AM IST daily
-    scheduler.add_job(
-        mark_absent_employees_daily,
-        'cron',
-        hour=10,
-        minute=45,
-        id='mark_absent_employees_daily',
-        name='Mark Absent Employees Daily',
-        max_instances=1,
-        coalesce=True,
-        replace_existing=True
+    # A run missed while leadership moves between processes still fires after the failover,
+    # unless the old leader already ran it (see resume_scheduler)
+    scheduler = BackgroundScheduler(
+        timezone=IST,
+        job_defaults={'misfire_grace_time': settings.SCHEDULER_MISFIRE_GRACE_TIME},
     )
     
-    scheduler.start()
+    # Every registered job on its cron schedule (absent marking at 10:45 AM IST daily)
+    for job in JOBS.values():
+        scheduler.add_job(
+            run_job,
+            'cron',
+            args=[job.id],
+            id=job.id,
+            name=job.name,
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True,
+            **job.schedule
+        )
+    
+    scheduler.start(paused=paused)
     
     # Use plain text instead of emojis to avoid encoding issues
-    logger.info("Calendar Scheduler started! Absent marking will run daily at 10:45 AM IST")
+    logger.info(f"Calendar Scheduler started with jobs: {', '.join(JOBS)}")
     logger.info("Configuration: max_instances=1, coalesce=True (prevents duplicates)")
+    return scheduler
+
+
+def resume_scheduler(scheduler):
+    """
+    Resume a paused scheduler after this process is elected leader.
+    A paused scheduler keeps each job's next_run_time, so a slot the previous leader
+    already ran would fire again; such jobs are moved on to their next slot instead.
+    """
+    now = timezone.now()
+    for job in scheduler.get_jobs():
+        due = job.next_run_time
+        if due is None or due > now:
+            continue
+        if JobRun.objects.filter(job=job.id, status="success", started_at__gte=due).exists():
+            next_run = job.trigger.get_next_fire_time(None, now)
+            logger.info(f"Job {job.id} already ran for {due}, next run at {next_run}")
+            job.modify(next_run_time=next_run)
+    scheduler.resume()
+
+
+def start_scheduler_host():
+    """
+    Start the scheduler paused in this process and run its jobs only while this
+    process is the elected leader, so they run once across all workers and nodes.
+    """
+    scheduler = start_scheduler(paused=True)
+    election = LeaderElection(on_elected=lambda: resume_scheduler(scheduler), on_deposed=scheduler.pause)
+    election.start()
+    atexit.register(election.stop)
+    return election
@@ -1,3 +1,72 @@
+from datetime import date
+
 from django.test import TestCase
 
-# Create your tests here.
+from .models import User, Employee, Leave, Holiday, AbsentEmployeeDetails, RaiseRequestAttendance
+from .payroll import lop_days_for_month
+from .working_calendar import invalidate_calendars
+
+EMAIL = "lop@example.com"
+
+
+class LopDaysTests(TestCase):
+    """LOP for May 2025: the 1st (Thursday) is a holiday and the 4th is a Sunday."""
+
+    def setUp(self):
+        user = User.objects.create(email=EMAIL, role="Employee")
+        Employee.objects.create(email=user, fullname="Lop Test", date_joined=date(2024, 1, 1))
+        Holiday.objects.create(name="May Day", date=date(2025, 5, 1), type="Public", year=2025, month=5)
+        invalidate_calendars()  # rolled-back holidays of other tests don't send post_delete
+
+    def absent(self, *days):
+        for day in days:
+            AbsentEmployeeDetails.objects.create(email_id=EMAIL, date=date(2025, 5, day))
+
+    def leave(self, start, end, paid_status):
+        Leave.objects.create(
+            email_id=EMAIL, start_date=date(2025, 5, start), end_date=date(2025, 5, end),
+            status="Approved", paid_status=paid_status,
+        )
+
+    def lop(self):
+        return lop_days_for_month(5, 2025).get(EMAIL, 0)
+
+    def test_absent_working_day_is_lop(self):
+        self.absent(6)
+        self.assertEqual(self.lop(), 1)
+
+    def test_paid_leave_excuses_absent_row(self):
+        self.absent(6, 7)
+        self.leave(6, 7, "Paid")
+        self.assertEqual(self.lop(), 0)
+
+    def test_leave_without_paid_status_excuses_absent_row(self):
+        self.absent(6)
+        self.leave(6, 6, None)
+        self.assertEqual(self.lop(), 0)
+
+    def test_pending_leave_does_not_excuse_absent_row(self):
+        self.absent(6)
+        Leave.objects.create(email_id=EMAIL, start_date=date(2025, 5, 6), end_date=date(2025, 5, 6), paid_status="Paid")
+        self.assertEqual(self.lop(), 1)
+
+    def test_unpaid_leave_overlapping_absent_counts_once(self):
+        self.absent(6)
+        self.leave(5, 7, "Unpaid")
+        self.assertEqual(self.lop(), 3)
+
+    def test_holiday_is_not_lop(self):
+        self.absent(1)
+        self.leave(1, 1, "Unpaid")
+        self.assertEqual(self.lop(), 0)
+
+    def test_sunday_is_not_lop(self):
+        self.absent(4)
+        self.leave(3, 5, "Unpaid")
+        self.assertEqual(self.lop(), 2)
+
+    def test_approved_correction_is_not_lop(self):
+        self.absent(6, 7)
+        RaiseRequestAttendance.objects.create(email_id=EMAIL, date=date(2025, 5, 6), reason="x", status="Approved")
+        RaiseRequestAttendance.objects.create(email_id=EMAIL, date=date(2025, 5, 7), reason="x", status="Rejected")
+        self.assertEqual(self.lop(), 1)
@@ -2,10 +2,11 @@ from django.urls import path
 from .views import raise_attendance_request, list_attendance_requests, review_attendance_request
 from accounts.views import (
     LoginView, CreateSuperUserView, SignupView, approve_user, reject_user,
-    today_attendance, RegisterView, list_attendance, DepartmentViewSet,
+    today_attendance, RegisterView, list_attendance, export_attendance, DepartmentViewSet,
     UserViewSet, EmployeeViewSet, HRViewSet, ManagerViewSet, AdminViewSet, CEOViewSet,
     apply_leave, update_leave_status, leaves_today, list_leaves,
-    create_payroll, update_payroll_status, get_payroll, list_payrolls,
+    create_payroll, run_monthly_payroll, update_payroll_status, get_payroll, lop_breakdown, list_payrolls, export_payrolls,
+    generate_payslips, payslip_job_status,
     list_tasks, get_task, update_task, delete_task, create_task,
     list_reports, create_report, update_report, delete_report,
     list_projects, create_project, get_project, update_project, delete_project,
@@ -13,7 +14,7 @@ from accounts.views import (
     get_employee_by_email, get_tasks_by_assigned_by, get_attendance, get_absent_employee,
     create_document, list_documents, get_document, update_document, delete_document,
     create_award, list_awards, get_award, update_award, delete_award,
-    attendance_page, mark_office_attendance_view, mark_work_attendance_view, mark_absent_employees, RequestPasswordResetView, PasswordResetConfirmView,
+    attendance_page, mark_office_attendance_view, mark_work_attendance_view, add_face_sample_view, checkin_ticket_status, mark_absent_employees, list_jobs, list_job_runs, trigger_job, RequestPasswordResetView, PasswordResetConfirmView,
     appointment_letter, offer_letter, releaving_letter, bonafide_certificate, TicketViewSet, 
     HolidayViewSet, list_absent_employees, CareerViewSet, AppliedJobViewSet, 
     transfer_to_releaved, approve_releaved, list_releaved_employees, get_releaved_employee, create_pettycash, 
@@ -54,9 +55,14 @@ urlpatterns = [
     path('list_leaves/', list_leaves, name='list_leaves'),
 
     path('create_payroll/', create_payroll, name='create_payroll'),
+    path('run_payroll/', run_monthly_payroll, name='run_monthly_payroll'),
     path('update_payroll/<int:payroll_id>/', update_payroll_status, name='update_payroll_status'),
     path('get_payroll/<path:email>/', get_payroll, name='get_payroll'),
+    path('payroll_lop/<path:email>/', lop_breakdown, name='lop_breakdown'),
     path('list_payrolls/', list_payrolls, name='list_payrolls'),
+    path('export/payrolls/', export_payrolls, name='export_payrolls'),
+    path('payslips/generate/', generate_payslips, name='generate_payslips'),
+    path('payslips/jobs/<uuid:job_id>/', payslip_job_status, name='payslip_job_status'),
 
     path('list_tasks/', list_tasks, name='list_tasks'),
     path('get_task/<int:task_id>/', get_task, name='get_task'),
@@ -98,9 +104,15 @@ urlpatterns = [
     path('attendance/', attendance_page, name='attendance_page'),  # frontend page
     path('office_attendance/', mark_office_attendance_view, name='mark_office_attendance'),
     path('work_attendance/', mark_work_attendance_view, name='mark_work_attendance'),
+    path('face_samples/', add_face_sample_view, name='add_face_sample'),
+    path('checkin_tickets/<uuid:ticket_id>/', checkin_ticket_status, name='checkin_ticket_status'),
     path('mark_absent/', mark_absent_employees, name='mark_absent_employees'),
+    path('jobs/', list_jobs, name='list_jobs'),
+    path('jobs/runs/', list_job_runs, name='list_job_runs'),
+    path('jobs/<str:job_id>/run/', trigger_job, name='trigger_job'),
     path("today_attendance/", today_attendance, name="today_attendance"),
     path('list_attendance/', list_attendance, name='attendance-list'),
+    path('export/attendance/', export_attendance, name='attendance-export'),
     path('get_attendance/<str:email>/', get_attendance, name='get_attendance'),
 
     path('password_reset/', RequestPasswordResetView.as_view(), name='password-reset'),
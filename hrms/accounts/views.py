@@ -1,9 +1,8 @@
-import os, json, pytz, face_recognition, tempfile, requests, boto3
+import os, json, pytz, boto3
 
 from io import BytesIO
 from pathlib import Path
 from datetime import datetime, timedelta, time
-from geopy.distance import geodesic
 from xhtml2pdf import pisa
 from threading import Thread
 
@@ -31,7 +30,7 @@ from django.http.multipartparser import MultiPartParser, MultiPartParserError
 from rest_framework import status, viewsets, generics, filters
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes, action
 
 # Models
@@ -39,8 +38,24 @@ from .models import (
     User, CEO, HR, Manager, Department, Employee, Attendance, Admin,
     Leave, Payroll, TaskTable, Project, Notice, Report,
     Document, Award, Ticket, EmployeeDetails, ReleavedEmployee, Holiday, AbsentEmployeeDetails, AppliedJobs, 
-    RaiseRequestAttendance, JobPosting, PettyCash
+    RaiseRequestAttendance, JobPosting, PettyCash, FaceEmbedding, FaceSample, CheckInTicket, JobRun, PayslipJob,
+    month_number, payroll_period,
 )
+from .face_embeddings import refresh_face_embedding, add_face_sample
+from .face_index import rebuild_face_index
+from .face_matcher import FaceMatcher
+from .face_pool import encode_faces, FaceEngineBusy, FaceEngineTimeout
+from .face_quality import ImageRejected
+from .geofence import home_site
+from .absence import mark_absent_for_date
+from .payroll import lop_days_for_month, explain_lop, run_payroll, filter_by_period
+from .exports import EXPORT_FORMATS, payroll_export, attendance_export
+from .payslips import start_payslip_job, active_payslip_job, fail_stale_jobs, payslip_job_payload
+from .jobs import JOBS, run_job, job_run_payload
+from .working_calendar import holiday_name
+from .attendance_pipeline import CheckInPipeline, CheckInFailed, POLICIES, run_checkin
+from .checkin_cache import dedup_checkin
+from .checkin_tickets import wants_async_checkin, enqueue_checkin, ticket_payload
 
 # Serializers
 from .serializers import (
@@ -52,23 +67,7 @@ from .serializers import (
 # Ensure User model points to custom one
 User = get_user_model()
 
-# Constants
-OFFICE_LAT = 13.068906816007116
-OFFICE_LON = 77.55541294505542
-LOCATION_RADIUS_METERS = 1000  # 100m allowed radius
-from .constants import IST, CHECK_IN_START, CHECK_IN_DEADLINE
-
-
-def verify_location(latitude, longitude, radius_meters=None):
-    """Verify if user is within allowed radius of office"""
-    if radius_meters is None:
-        radius_meters = LOCATION_RADIUS_METERS
-    
-    user_location = (latitude, longitude)
-    office_location = (OFFICE_LAT, OFFICE_LON)
-    distance_meters = geodesic(user_location, office_location).meters
-    
-    return distance_meters <= radius_meters, distance_meters
+from .constants import IST, CHECK_IN_DEADLINE
 
 
 class SignupView(APIView):
@@ -173,70 +172,26 @@ def is_email_exists(email):
 def mark_attendance_by_email(email_str, latitude=None, longitude=None):
     """
     Marks attendance for a user based on email and live location.
-    Only works if user is within 100 meters of the office.
+    Only works if user is within the radius of an office site.
     Automatically marks absent if no check-in before 10:45 AM.
     """
-    if not is_email_exists(email_str):
-        print(f"[mark_attendance_by_email] Email {email_str} not found. Attendance not marked.")
-        return None
-
     if latitude is None or longitude is None:
         print("[mark_attendance_by_email] Location not provided — attendance not marked.")
         return None
 
-    is_within_radius, distance_meters = verify_location(latitude, longitude)
-    
-    if not is_within_radius:
-        print(f"[mark_attendance_by_email] User {email_str} is too far ({distance_meters:.2f}m). Attendance denied.")
-        return None
-
-    today = timezone.localdate()
-    now = timezone.now().astimezone(IST)
-    current_time = now.time()
-    print(f"[mark_attendance_by_email] Processing attendance for {email_str} on {today} at {now}")
-
+    pipeline = CheckInPipeline(POLICIES["manual"], latitude, longitude)
     try:
-        user_instance = User.objects.get(email=email_str)
-    except User.DoesNotExist:
-        print(f"[mark_attendance_by_email] User instance not found for {email_str}")
+        outcome = pipeline.check_in_person(email_str)
+    except CheckInFailed as e:
+        print(f"[mark_attendance_by_email] Attendance not marked for {email_str}: {e.message}")
         return None
 
-    # ------------------- Check for existing attendance ------------------- #
-    attendance_exists = Attendance.objects.filter(email=user_instance, date=today).exists()
-
-    # ------------------- Automatically mark absent if past 10:45 and no check-in ------------------- #
-    if current_time > CHECK_IN_DEADLINE and not attendance_exists:
-        absent_entry, created = AbsentEmployeeDetails.objects.get_or_create(
-            email=user_instance,
-            date=today
-        )
-        if created:
-            print(f"[mark_attendance_by_email] {email_str} did not check in before 10:45 AM. Marked as absent.")
+    if outcome == "absent":
+        print(f"[mark_attendance_by_email] {email_str} did not check in before 10:45 AM. Marked as absent.")
         return None  # Do not allow late check-in
 
-    # ------------------- Existing Attendance Logic ------------------- #
-    try:
-        attendance = Attendance.objects.get(email=user_instance, date=today)
-        if attendance.check_out is None:
-            attendance.check_out = current_time
-            attendance.save()
-            print(f"[mark_attendance_by_email] Updated check_out for {email_str} at {now}")
-    except Attendance.DoesNotExist:
-        try:
-            attendance = Attendance.objects.create(
-                email=user_instance,
-                date=today,
-                check_in=current_time,
-                latitude=latitude,
-                longitude=longitude,
-                location_verified=True  # ✅ within 100m radius
-            )
-            print(f"[mark_attendance_by_email] Created new attendance record for {email_str} at {now}")
-        except Exception as e:
-            print(f"[mark_attendance_by_email ERROR] Failed to save attendance for {email_str}: {e}")
-            return None
-
-    return attendance
+    print(f"[mark_attendance_by_email] {email_str}: {outcome} at {pipeline.now}")
+    return Attendance.objects.filter(email_id=email_str, date=pipeline.today).first()
 
 
 def today_attendance(request):
@@ -375,11 +330,18 @@ class BaseUserViewSet(viewsets.ModelViewSet):
             except Exception as e:
                 print(f"Failed to delete old picture: {e}")
 
+        # Keep the raw bytes so the face embedding is computed without re-downloading
+        image_bytes = file_obj.read()
+        file_obj.seek(0)
+
         # Upload new picture
         client.upload_fileobj(file_obj, BUCKET_NAME, key, ExtraArgs={"ContentType": file_obj.content_type})
         instance.profile_picture = f"{BASE_BUCKET_URL}{key}"
         instance.save()
 
+        # Store face embedding used by attendance check-ins
+        refresh_face_embedding(email_str, image_bytes=image_bytes, source_url=instance.profile_picture)
+
 
     def _update_employee_details(self, instance, data):
         details_fields = [
@@ -405,6 +367,9 @@ class BaseUserViewSet(viewsets.ModelViewSet):
 
         if profile_file:
             self._upload_profile_picture(instance, profile_file)
+        elif getattr(instance, "profile_picture", None):
+            # Profile picture given as a URL: compute its embedding once now
+            refresh_face_embedding(instance.email_id, source_url=instance.profile_picture)
 
         # Update related EmployeeDetails if applicable
         if hasattr(instance, "email"):
@@ -741,37 +706,10 @@ def list_leaves(request):
 
 def calculate_lop_days(user, month, year):
     """
-    Calculate LOP (Loss of Pay) days based on approved unpaid leaves for a given month/year
+    Calculate LOP (Loss of Pay) days for a given month/year from approved unpaid leaves
+    and absent days on working days, less approved attendance corrections
     """
-    # Get all approved unpaid leaves for this employee
-    unpaid_leaves = Leave.objects.filter(
-        email=user,
-        status="Approved",
-        paid_status="Unpaid"
-    )
-    
-    lop_days = 0
-    target_month = int(month)
-    target_year = int(year)
-    
-    import calendar
-    from datetime import date
-    
-    # Get the first and last day of the target month
-    first_day = date(target_year, target_month, 1)
-    last_day = date(target_year, target_month, calendar.monthrange(target_year, target_month)[1])
-    
-    for leave in unpaid_leaves:
-        # Check if the leave overlaps with the target month
-        if leave.start_date <= last_day and leave.end_date >= first_day:
-            # Calculate the overlapping period
-            overlap_start = max(leave.start_date, first_day)
-            overlap_end = min(leave.end_date, last_day)
-            
-            # Add the number of overlapping days (inclusive)
-            lop_days += (overlap_end - overlap_start).days + 1
-            
-    return lop_days
+    return lop_days_for_month(month, year, emails=[user.email]).get(user.email, 0)
 
 
 @csrf_exempt
@@ -788,8 +726,10 @@ def create_payroll(request):
         month = data.get("month")
         year = data.get("year", timezone.now().year)
 
-        # Check if payroll already exists for this month/year
-        if Payroll.objects.filter(email=user, month=month, year=year).exists():
+        # Check if payroll already exists for this month/year, however the month was written
+        period = payroll_period(month, year)
+        existing = Payroll.objects.filter(email=user, period=period) if period else Payroll.objects.filter(email=user, month=month, year=year)
+        if existing.exists():
             return JsonResponse({"error": "Payroll already exists for this month and year"}, status=400)
 
         # Calculate LOP (Loss of Pay) days based on unpaid leaves
@@ -827,6 +767,32 @@ def create_payroll(request):
         return JsonResponse({"error": str(e)}, status=400)
 
 
+@csrf_exempt
+def run_monthly_payroll(request):
+    """Create payroll for every employee for a month, computing LOP for all of them at once"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method allowed"}, status=405)
+
+    try:
+        data = json.loads(request.body or "{}")
+        month = data.get("month")
+        year = data.get("year", timezone.now().year)
+        if not month:
+            return JsonResponse({"error": "month is required"}, status=400)
+
+        summary = run_payroll(
+            month,
+            year,
+            salaries=data.get("salaries"),
+            status=data.get("status", "Pending"),
+        )
+        print(f"Payroll run {summary['month']}/{summary['year']}: {summary['created']} created in {summary['duration_ms']}ms")
+        return JsonResponse({"message": "Payroll run completed", "summary": summary}, status=201)
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
 @csrf_exempt
 def update_payroll_status(request, payroll_id):
     """Update payroll status using payroll ID."""
@@ -881,52 +847,123 @@ def update_payroll_status(request, payroll_id):
         return JsonResponse({"error": str(e)}, status=400)
 
 
+def payroll_payload(payroll):
+    return {
+        "id": payroll.id,
+        "email": payroll.email_id,
+        "basic_salary": str(payroll.basic_salary),
+        "STD": payroll.STD,
+        "LOP": payroll.LOP,
+        "month": payroll.month,
+        "year": payroll.year,
+        "period": payroll.period,
+        "status": payroll.status,
+        "pay_date": str(payroll.pay_date),
+    }
+
+
 def get_payroll(request, email):
-    """Fetch all payroll details for an employee"""
+    """Fetch all payroll details for an employee, optionally for periods ?from=yyyymm&to=yyyymm"""
     if request.method != "GET":
         return JsonResponse({"error": "Only GET method allowed"}, status=405)
 
     user = get_object_or_404(User, email=email)
-    payrolls = Payroll.objects.filter(email=user).order_by('-year', '-month')
-
-    payroll_list = []
-    for payroll in payrolls:
-        payroll_list.append({
-            "id": payroll.id,
-            "email": payroll.email.email,
-            "basic_salary": str(payroll.basic_salary),
-            "STD": payroll.STD,
-            "LOP": payroll.LOP,
-            "month": payroll.month,
-            "year": payroll.year,
-            "status": payroll.status,
-            "pay_date": str(payroll.pay_date),
-        })
+    try:
+        payrolls = filter_by_period(Payroll.objects.filter(email=user), request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
+    payroll_list = [payroll_payload(payroll) for payroll in payrolls.order_by('-period', '-pay_date')]
     return JsonResponse({"payrolls": payroll_list}, status=200)
 
 
+@require_GET
+def lop_breakdown(request, email):
+    """Day-by-day explanation of an employee's LOP for a month (?month=&year=)"""
+    user = get_object_or_404(User, email=email)
+    month = request.GET.get("month")
+    year = request.GET.get("year", timezone.now().year)
+    if not month:
+        return JsonResponse({"error": "month is required"}, status=400)
+
+    try:
+        return JsonResponse(explain_lop(user.email, month, year), status=200)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
 @require_GET
 def list_payrolls(request):
-    """List all payrolls"""
-    payrolls = Payroll.objects.all().order_by('-pay_date')
+    """List all payrolls, optionally for periods ?from=yyyymm&to=yyyymm and a ?department="""
+    try:
+        payrolls = filter_by_period(Payroll.objects.all(), request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
-    result = []
-    for payroll in payrolls:
-        result.append({
-            "id": payroll.id,
-            "email": payroll.email.email,
-            "basic_salary": str(payroll.basic_salary),
-            "STD": payroll.STD,
-            "LOP": payroll.LOP,
-            "month": payroll.month,
-            "year": payroll.year,
-            "status": payroll.status,
-            "pay_date": str(payroll.pay_date),
-        })
+    department = request.GET.get("department")
+    if department:
+        payrolls = payrolls.filter(email__employee__department=department)
 
+    result = [payroll_payload(payroll) for payroll in payrolls.order_by('-period', '-pay_date')]
     return JsonResponse({"payrolls": result}, status=200)
 
+@csrf_exempt
+def generate_payslips(request):
+    """Start generating payslip PDFs for all payrolls of a month; poll the returned job"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method allowed"}, status=405)
+
+    try:
+        data = json.loads(request.body or "{}")
+        month = month_number(data.get("month", ""))
+        year = int(data.get("year", timezone.now().year))
+        if month is None:
+            return JsonResponse({"error": "A valid month is required"}, status=400)
+        period = year * 100 + month
+
+        if not Payroll.objects.filter(period=period).exists():
+            return JsonResponse({"error": f"No payrolls for {month}/{year}"}, status=404)
+
+        running = active_payslip_job(period)
+        if running:
+            return JsonResponse({"error": "Payslips for this month are already being generated", "job": payslip_job_payload(running)}, status=409)
+
+        job = start_payslip_job(period)
+        return JsonResponse({
+            "message": "Payslip generation started",
+            "job": payslip_job_payload(job),
+            "poll_url": f"/api/accounts/payslips/jobs/{job.id}/",
+        }, status=202)
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+@require_GET
+def payslip_job_status(request, job_id):
+    """Progress of a payslip generation job"""
+    job = get_object_or_404(PayslipJob, id=job_id)
+    if job.status in ("pending", "running") and fail_stale_jobs(job.period):
+        job.refresh_from_db()
+    return JsonResponse(payslip_job_payload(job), status=200)
+
+
+def _export(request, build_export):
+    export_format = request.GET.get("format", "csv").lower()
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+    try:
+        return EXPORT_FORMATS[export_format](build_export(request.GET))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+@require_GET
+def export_payrolls(request):
+    """Download payrolls as CSV or XLSX (?format=), optionally ?from=yyyymm&to=yyyymm and ?department="""
+    return _export(request, payroll_export)
+
+
 @require_GET
 def list_tasks(request):
     tasks = TaskTable.objects.all().order_by('-created_at')
@@ -1091,6 +1128,12 @@ def list_attendance(request):
     return JsonResponse({"attendance": result}, status=200)
 
 
+@require_GET
+def export_attendance(request):
+    """Download attendance as CSV or XLSX (?format=), optionally ?from=YYYY-MM-DD&to=YYYY-MM-DD and ?department="""
+    return _export(request, attendance_export)
+
+
 @require_GET
 def get_attendance(request, email):
     """Get attendance records for a specific email"""
@@ -1788,25 +1831,9 @@ class TicketViewSet(viewsets.ModelViewSet):
         return Ticket.objects.all()
 
 
-IST = timezone.get_fixed_timezone(330)  # IST is UTC+5:30
-CHECK_IN_DEADLINE = time(10, 45)  # 10:45 AM
-LOCATION_RADIUS_METERS = 1000  # 100 meters
-
-def get_all_users_with_photos():
-    """Return all users from Employee, HR, CEO, Manager, and Admin models that have profile pictures."""
-    from accounts.models import Employee, HR, CEO, Manager, Admin
-
-    user_types = [Employee, HR, CEO, Manager, Admin]
-    all_users = []
-
-    for model in user_types:
-        all_users += list(model.objects.exclude(profile_picture__isnull=True).exclude(profile_picture=""))
-    
-    return all_users
-
-
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@dedup_checkin("office")
 def mark_office_attendance_view(request):
     """Mark attendance from office location (within 1000m radius)"""
     try:
@@ -1826,139 +1853,12 @@ def mark_office_attendance_view(request):
         if not uploaded_file:
             return JsonResponse({"status": "fail", "message": "No image provided"}, status=400)
 
-        # Save uploaded image temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            for chunk in uploaded_file.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
-
-        uploaded_img = face_recognition.load_image_file(tmp_path)
-        uploaded_encodings = face_recognition.face_encodings(uploaded_img)
-        if not uploaded_encodings:
-            os.remove(tmp_path)
-            return JsonResponse({"status": "fail", "message": "No face detected"}, status=400)
-
-        uploaded_encoding = uploaded_encodings[0]
-
-        # Current date/time in IST
-        now_ist = timezone.localtime(timezone.now(), IST)
-        today = now_ist.date()
-        current_time = now_ist.time()
-
-        # Loop through all user types
-        people = get_all_users_with_photos()
-        for person in people:
-            if not person.profile_picture:
-                continue
-
-            try:
-                response = requests.get(person.profile_picture, timeout=10)
-                if response.status_code != 200:
-                    continue
-
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as emp_tmp:
-                    emp_tmp.write(response.content)
-                    emp_tmp_path = emp_tmp.name
-
-                emp_img = face_recognition.load_image_file(emp_tmp_path)
-                emp_encodings = face_recognition.face_encodings(emp_img)
-                os.remove(emp_tmp_path)
-
-                if not emp_encodings:
-                    continue
+        batch = str(request.POST.get("batch", "")).lower() in ("1", "true", "yes")
+        if wants_async_checkin(request):
+            return enqueue_checkin("office", uploaded_file.read(), latitude, longitude, batch=batch)
 
-                emp_encoding = emp_encodings[0]
-                match = face_recognition.compare_faces([emp_encoding], uploaded_encoding, tolerance=0.5)
-
-                if match[0]:
-                    # Verify location (office radius)
-                    is_within_radius, distance_meters = verify_location(latitude, longitude, LOCATION_RADIUS_METERS)
-
-                    if not is_within_radius:
-                        os.remove(tmp_path)
-                        return JsonResponse({
-                            "status": "fail",
-                            "message": f"User too far from office ({distance_meters:.2f} meters). Must be within {LOCATION_RADIUS_METERS}m."
-                        }, status=400)
-
-                    now_ist = timezone.localtime(timezone.now(), IST)
-                    today = now_ist.date()
-                    now_time = now_ist.time()
-
-                    existing = Attendance.objects.filter(email=person.email, date=today).first()
-                    if existing:
-                        if existing.check_out:
-                            msg = f"Attendance already marked for today ({person.fullname})"
-                        else:
-                            existing.check_out = now_time
-                            existing.latitude = latitude
-                            existing.longitude = longitude
-                            existing.location_type = "office"
-                            existing.save()
-                            msg = f"Office check-out marked for {person.fullname}"
-                        os.remove(tmp_path)
-                        return JsonResponse({"status": "success", "message": msg})
-
-                    # Check if deadline applies (Mon-Sat, not holiday)
-                    enforce_deadline = True
-                    if today.weekday() == 6:
-                        enforce_deadline = False
-                    else:
-                        from accounts.models import Holiday
-                        if Holiday.objects.filter(date=today).exists():
-                            enforce_deadline = False
-
-                    # Block before 7 AM
-                    if now_time < CHECK_IN_START:
-                        os.remove(tmp_path)
-                        return JsonResponse({
-                            "status": "fail",
-                            "message": "Check-in opens at 07:00 AM IST. Please try after 07:00."
-                        }, status=400)
-
-                    # Mark absent if first attempt after deadline
-                    if enforce_deadline and now_time > CHECK_IN_DEADLINE:
-                        AbsentEmployeeDetails.objects.get_or_create(email=person.email, date=today)
-                        os.remove(tmp_path)
-                        return JsonResponse({
-                            "status": "fail",
-                            "message": "Late first attempt. Marked absent for today as no check-in before 10:45 AM IST."
-                        }, status=400)
-
-                    # Otherwise, mark attendance
-                    obj, created = Attendance.objects.get_or_create(
-                        email=person.email,
-                        date=today,
-                        defaults={
-                            "check_in": now_time,
-                            "latitude": latitude,
-                            "longitude": longitude,
-                            "location_type": "office",
-                        }
-                    )
-
-                    if created:
-                        msg = f"Office check-in marked for {person.fullname}"
-                    else:
-                        if obj.check_out:
-                            msg = f"Attendance already marked for today ({person.fullname})"
-                        else:
-                            obj.check_out = now_time
-                            obj.latitude = latitude
-                            obj.longitude = longitude
-                            obj.location_type = "office"
-                            obj.save()
-                            msg = f"Office check-out marked for {person.fullname}"
-
-                    os.remove(tmp_path)
-                    return JsonResponse({"status": "success", "message": msg})
-
-            except Exception as err:
-                print(f"Error processing {person.email}: {err}")
-                continue
-
-        os.remove(tmp_path)
-        return JsonResponse({"status": "fail", "message": "No match found"}, status=404)
+        # Kiosk frames with several people: check in every recognised face at once
+        return run_checkin("office", uploaded_file.read(), latitude, longitude, batch=batch)
 
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=500)
@@ -1966,6 +1866,7 @@ def mark_office_attendance_view(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@dedup_checkin("work")
 def mark_work_attendance_view(request):
     """Mark attendance for work from home (no location restriction)"""
     try:
@@ -1980,132 +1881,76 @@ def mark_work_attendance_view(request):
             except ValueError:
                 latitude = None
                 longitude = None
+        else:
+            latitude = None
+            longitude = None
 
         uploaded_file = request.FILES.get('image')
         if not uploaded_file:
             return JsonResponse({"status": "fail", "message": "No image provided"}, status=400)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            for chunk in uploaded_file.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
-
-        uploaded_img = face_recognition.load_image_file(tmp_path)
-        uploaded_encodings = face_recognition.face_encodings(uploaded_img)
-        if not uploaded_encodings:
-            os.remove(tmp_path)
-            return JsonResponse({"status": "fail", "message": "No face detected"}, status=400)
-
-        uploaded_encoding = uploaded_encodings[0]
-        now_ist = timezone.localtime(timezone.now(), IST)
-        today = now_ist.date()
-        current_time = now_ist.time()
-
-        if current_time < CHECK_IN_START:
-            os.remove(tmp_path)
-            return JsonResponse({
-                "status": "fail",
-                "message": "Check-in opens at 07:00 AM IST. Please try after 07:00."
-            }, status=400)
-
-        # Loop through all user types
-        people = get_all_users_with_photos()
-        for person in people:
-            if not person.profile_picture:
-                continue
+        if wants_async_checkin(request):
+            return enqueue_checkin("work", uploaded_file.read(), latitude, longitude)
+        return run_checkin("work", uploaded_file.read(), latitude, longitude)
 
-            try:
-                response = requests.get(person.profile_picture, timeout=10)
-                if response.status_code != 200:
-                    continue
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=500)
 
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as emp_tmp:
-                    emp_tmp.write(response.content)
-                    emp_tmp_path = emp_tmp.name
 
-                emp_img = face_recognition.load_image_file(emp_tmp_path)
-                emp_encodings = face_recognition.face_encodings(emp_img)
-                os.remove(emp_tmp_path)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def checkin_ticket_status(request, ticket_id):
+    """Poll the outcome of an async check-in ticket"""
+    ticket = CheckInTicket.objects.filter(id=ticket_id).defer("image").first()
+    if ticket is None:
+        return JsonResponse({"status": "fail", "message": "Ticket not found"}, status=404)
+    return JsonResponse(ticket_payload(ticket))
 
-                if not emp_encodings:
-                    continue
 
-                emp_encoding = emp_encodings[0]
-                match = face_recognition.compare_faces([emp_encoding], uploaded_encoding, tolerance=0.5)
+# Roles allowed to add reference faces for other users
+FACE_ENROLL_ROLES = {"admin", "hr", "ceo"}
 
-                if match[0]:
-                    now_ist = timezone.localtime(timezone.now(), IST)
-                    today = now_ist.date()
-                    now_time = now_ist.time()
 
-                    existing = Attendance.objects.filter(email=person.email, date=today).first()
-                    if existing:
-                        if existing.check_out:
-                            msg = f"Attendance already marked for today ({person.fullname})"
-                        else:
-                            existing.check_out = now_time
-                            existing.longitude = longitude
-                            existing.location_type = "work"
-                            existing.save()
-                            msg = f"Work from home check-out marked for {person.fullname}"
-                        os.remove(tmp_path)
-                        return JsonResponse({"status": "success", "message": msg})
-
-                    enforce_deadline = True
-                    if today.weekday() == 6:
-                        enforce_deadline = False
-                    else:
-                        from accounts.models import Holiday
-                        if Holiday.objects.filter(date=today).exists():
-                            enforce_deadline = False
-
-                    if now_time < CHECK_IN_START:
-                        os.remove(tmp_path)
-                        return JsonResponse({
-                            "status": "fail",
-                            "message": "Check-in opens at 07:00 AM IST. Please try after 07:00."
-                        }, status=400)
-
-                    if enforce_deadline and now_time > CHECK_IN_DEADLINE:
-                        AbsentEmployeeDetails.objects.get_or_create(email=person.email, date=today)
-                        os.remove(tmp_path)
-                        return JsonResponse({
-                            "status": "fail",
-                            "message": "Late first attempt. Marked absent for today as no check-in before 10:45 AM IST."
-                        }, status=400)
-
-                    obj, created = Attendance.objects.get_or_create(
-                        email=person.email,
-                        date=today,
-                        defaults={
-                            "check_in": now_time,
-                            "latitude": latitude,
-                            "longitude": longitude,
-                            "location_type": "work",
-                        }
-                    )
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def add_face_sample_view(request):
+    """Register an extra reference photo for a user's face recognition (the user themselves, or HR/admin/CEO)"""
+    try:
+        email = request.POST.get("email")
+        uploaded_file = request.FILES.get('image')
+        if not email or not uploaded_file:
+            return JsonResponse({"status": "fail", "message": "Email and image are required"}, status=400)
+        if request.user.email != email and (request.user.role or "").lower() not in FACE_ENROLL_ROLES:
+            return JsonResponse({"status": "fail", "message": "Not allowed to add face samples for this user"}, status=403)
+        if not User.objects.filter(email=email).exists():
+            return JsonResponse({"status": "fail", "message": "User not found"}, status=404)
 
-                    if created:
-                        msg = f"Work from home check-in marked for {person.fullname}"
-                    else:
-                        if obj.check_out:
-                            msg = f"Attendance already marked for today ({person.fullname})"
-                        else:
-                            obj.check_out = now_time
-                            obj.longitude = longitude
-                            obj.location_type = "work"
-                            obj.save()
-                            msg = f"Work from home check-out marked for {person.fullname}"
+        try:
+            encodings = encode_faces(uploaded_file.read())
+        except FaceEngineBusy as e:
+            return JsonResponse({"status": "fail", "message": str(e)}, status=503)
+        except FaceEngineTimeout as e:
+            return JsonResponse({"status": "fail", "message": str(e)}, status=504)
+        except ImageRejected as e:
+            return JsonResponse({"status": "fail", "message": str(e), "reason": e.reason}, status=400)
+        if not encodings:
+            return JsonResponse({"status": "fail", "message": "No face detected"}, status=400)
+        if len(encodings) > 1:
+            return JsonResponse({"status": "fail", "message": "Multiple faces detected, please upload a photo of one person"}, status=400)
 
-                    os.remove(tmp_path)
-                    return JsonResponse({"status": "success", "message": msg})
+        # The new photo must not look like someone else, nor unlike the user's existing photos
+        matcher = FaceMatcher.from_index()
+        match = matcher.best_match(encodings[0])
+        if match and match.email != email:
+            return JsonResponse({"status": "fail", "message": "Face matches a different user"}, status=400)
+        if match is None and email in matcher.emails:
+            return JsonResponse({"status": "fail", "message": "Face does not match the user's registered photos"}, status=400)
 
-            except Exception as err:
-                print(f"Error processing {person.email}: {err}")
-                continue
+        add_face_sample(email, encodings[0], source="upload")
+        rebuild_face_index()
 
-        os.remove(tmp_path)
-        return JsonResponse({"status": "fail", "message": "No match found"}, status=404)
+        total = FaceSample.objects.filter(email_id=email).count() + FaceEmbedding.objects.filter(email_id=email).count()
+        return JsonResponse({"status": "success", "message": f"Face sample added for {email}", "samples": total}, status=201)
 
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=500)
@@ -2135,15 +1980,13 @@ def mark_absent_employees(request):
             }, status=200)
         
         # Check if today is a holiday
-        from accounts.models import Holiday
-        is_holiday = Holiday.objects.filter(date=today).exists()
-        if is_holiday:
-            holiday = Holiday.objects.get(date=today)
+        holiday = holiday_name(today)
+        if holiday:
             return JsonResponse({
                 "status": "info",
-                "message": f"Today is a holiday: {holiday.name} - No absent marking needed!",
+                "message": f"Today is a holiday: {holiday} - No absent marking needed!",
                 "date": str(today),
-                "holiday_name": holiday.name,
+                "holiday_name": holiday,
                 "weekday": weekday_name
             }, status=200)
         
@@ -2156,47 +1999,16 @@ def mark_absent_employees(request):
                 "message": "Not yet 10:45 AM IST. Absent marking skipped."
             }, status=200)
         
-        # Get all active employees
-        all_employees = Employee.objects.all()
-        marked_absent_count = 0
-        absent_employees = []
-        
-        for emp in all_employees:
-            # Check if employee has checked in today
-            attendance_exists = Attendance.objects.filter(
-                email=emp.email,
-                date=today,
-                check_in__isnull=False
-            ).exists()
-            
-            if not attendance_exists:
-                # Check if already marked absent
-                already_absent = AbsentEmployeeDetails.objects.filter(
-                    email=emp.email,
-                    date=today
-                ).exists()
-                
-                if not already_absent:
-                    # Mark as absent (idempotent)
-                    _, created = AbsentEmployeeDetails.objects.get_or_create(
-                        email=emp.email,
-                        date=today
-                    )
-                    if created:
-                        marked_absent_count += 1
-                        absent_employees.append({
-                            "email": emp.email.email,
-                            "fullname": emp.fullname,
-                            "department": emp.department
-                        })
-        
+        # Employees with no check-in and no absent row, found and inserted in bulk
+        sweep = mark_absent_for_date(today)
+
         return JsonResponse({
             "status": "success",
-            "message": f"Marked {marked_absent_count} employees as absent for {today}",
+            "message": f"Marked {len(sweep.absent)} employees as absent for {today}",
             "date": str(today),
             "weekday": weekday_name,
-            "absent_employees": absent_employees,
-            "total_checked": all_employees.count()
+            "absent_employees": sweep.absent,
+            "total_checked": sweep.total
         }, status=200)
         
     except Exception as e:
@@ -2206,6 +2018,50 @@ def mark_absent_employees(request):
         }, status=500)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def list_jobs(request):
+    """Registered background jobs with their schedule and latest run"""
+    jobs = []
+    for job in JOBS.values():
+        last_run = JobRun.objects.filter(job=job.id).first()
+        jobs.append({
+            "id": job.id,
+            "name": job.name,
+            "schedule": job.schedule,
+            "last_run": job_run_payload(last_run) if last_run else None,
+        })
+    return JsonResponse({"jobs": jobs})
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def list_job_runs(request):
+    """Recent job runs, newest first; filter with ?job=<id> and cap with ?limit=<n> (max 500)"""
+    runs = JobRun.objects.all()
+    job_id = request.GET.get("job")
+    if job_id:
+        runs = runs.filter(job=job_id)
+    try:
+        limit = int(request.GET.get("limit", 50))
+    except ValueError:
+        return JsonResponse({"status": "fail", "message": "limit must be a number"}, status=400)
+    if limit < 1:
+        return JsonResponse({"status": "fail", "message": "limit must be at least 1"}, status=400)
+    limit = min(limit, 500)
+    return JsonResponse({"runs": [job_run_payload(run) for run in runs[:limit]]})
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def trigger_job(request, job_id):
+    """Run a registered job now and return its run record"""
+    if job_id not in JOBS:
+        return JsonResponse({"status": "fail", "message": f"Unknown job {job_id}"}, status=404)
+    run = run_job(job_id, trigger="manual")
+    return JsonResponse(job_run_payload(run), status=200 if run.status == "success" else 500)
+
+
 token_generator = PasswordResetTokenGenerator()
 
 # Helper function to send email asynchronously
@@ -2903,16 +2759,18 @@ def review_attendance_request(request, pk):
         # Remove absent record if present
         AbsentEmployeeDetails.objects.filter(email=req.email, date=req.date).delete()
 
-        # Ensure an attendance record exists; if not, create with check_in at deadline
-        from .constants import CHECK_IN_DEADLINE
+        # Ensure an attendance record exists; if not, create one at the deadline at the employee's office site
+        employee = Employee.objects.filter(email=req.email).only('work_location').first()
+        site = home_site(employee.work_location if employee else None)
         Attendance.objects.get_or_create(
             email=req.email,
             date=req.date,
             defaults={
                 'check_in': CHECK_IN_DEADLINE,
                 'location_type': 'office',
-                'latitude': OFFICE_LAT,
-                'longitude': OFFICE_LON
+                'site_id': site.id if site else None,
+                'latitude': site.latitude if site else None,
+                'longitude': site.longitude if site else None,
             }
         )
 
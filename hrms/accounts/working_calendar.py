@@ -0,0 +1,149 @@
+"""
+Cached working-day calendar.
+
+Monday to Saturday are working days unless the Holiday table lists the date for the
+country. Each (year, country) is loaded from the database once into a NumPy
+busdaycalendar plus a per-day boolean bitmap, so is_working_day is an array lookup
+and day counts use np.busday_count instead of a query per date.
+
+Saving or deleting a Holiday drops this process' calendars and bumps a version
+number in the default cache (holiday_changed is connected in AccountsConfig.ready).
+Other processes compare that version at most every WORKING_CALENDAR_CHECK_INTERVAL
+seconds and reload when it changed; this reaches other hosts only when the cache is
+shared (REDIS_URL). Holidays written without signals, e.g. by bulk_create or update(),
+show up once a calendar is older than WORKING_CALENDAR_TTL seconds.
+"""
+import time
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Holiday
+
+WEEKMASK = "1111110"  # Monday-Saturday
+VERSION_KEY = "working_calendar:version"
+
+
+class WorkingCalendar:
+    """Working days of one year for one country."""
+
+    def __init__(self, year, holidays):
+        self.year = year
+        self.holidays = dict(holidays)  # {date: name}
+        self.first_day = date(year, 1, 1)
+        self.busdaycal = np.busdaycalendar(
+            weekmask=WEEKMASK,
+            holidays=np.array(sorted(self.holidays), dtype="datetime64[D]"),
+        )
+        days = np.arange(
+            np.datetime64(self.first_day), np.datetime64(date(year + 1, 1, 1)), dtype="datetime64[D]"
+        )
+        self.bitmap = np.is_busday(days, busdaycal=self.busdaycal)
+
+    def is_working_day(self, day):
+        return bool(self.bitmap[(day - self.first_day).days])
+
+    def working_days_between(self, start, end):
+        """Working days from start to end, both inclusive (both within this year)."""
+        return int(np.busday_count(start, end + timedelta(days=1), busdaycal=self.busdaycal))
+
+    def working_mask(self, start, end):
+        """Boolean array with one entry per day from start to end, both inclusive (both within this year)."""
+        offset = (start - self.first_day).days
+        return self.bitmap[offset:offset + (end - start).days + 1]
+
+
+def _load_calendar(year, country):
+    holidays = Holiday.objects.filter(date__year=year, country=country).values_list("date", "name")
+    return WorkingCalendar(year, holidays)
+
+
+_lock = threading.Lock()
+_calendars = {}  # (year, country) -> (loaded at, WorkingCalendar)
+_version = None
+_last_check = 0.0
+
+
+def get_calendar(year, country=None):
+    """Return the cached WorkingCalendar for year and country (default HOLIDAY_COUNTRY)."""
+    global _version, _last_check
+    country = country or settings.HOLIDAY_COUNTRY
+    with _lock:
+        if time.monotonic() - _last_check >= settings.WORKING_CALENDAR_CHECK_INTERVAL:
+            _last_check = time.monotonic()
+            version = cache.get(VERSION_KEY)
+            if version != _version:
+                _calendars.clear()
+                _version = version
+        loaded_at, calendar = _calendars.get((year, country), (None, None))
+        if calendar is None or time.monotonic() - loaded_at >= settings.WORKING_CALENDAR_TTL:
+            calendar = _load_calendar(year, country)
+            _calendars[(year, country)] = (time.monotonic(), calendar)
+        return calendar
+
+
+def invalidate_calendars():
+    global _version
+    with _lock:
+        _calendars.clear()
+        _version = time.time_ns()
+        cache.set(VERSION_KEY, _version, None)
+
+
+def holiday_changed(sender, **kwargs):
+    """post_save/post_delete receiver for Holiday."""
+    invalidate_calendars()
+
+
+def is_working_day(day, country=None):
+    """True unless day is a Sunday or a holiday."""
+    return get_calendar(day.year, country).is_working_day(day)
+
+
+def holiday_name(day, country=None):
+    """Name of the holiday on day, or None."""
+    return get_calendar(day.year, country).holidays.get(day)
+
+
+def working_days_between(start, end, country=None):
+    """Number of working days from start to end, both inclusive (0 when end < start)."""
+    total = 0
+    for year in range(start.year, end.year + 1):
+        first = max(start, date(year, 1, 1))
+        last = min(end, date(year, 12, 31))
+        if first <= last:
+            total += get_calendar(year, country).working_days_between(first, last)
+    return total
+
+
+def working_mask(start, end, country=None):
+    """Boolean NumPy array, True for each working day from start to end, both inclusive."""
+    masks = []
+    for year in range(start.year, end.year + 1):
+        first = max(start, date(year, 1, 1))
+        last = min(end, date(year, 12, 31))
+        if first <= last:
+            masks.append(get_calendar(year, country).working_mask(first, last))
+    return np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+
+
+def working_days(start, end, country=None):
+    """List of the working days from start to end, both inclusive."""
+    days = []
+    day = start
+    while day <= end:
+        if is_working_day(day, country):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def next_working_day(day, country=None):
+    """First working day strictly after day."""
+    day += timedelta(days=1)
+    while not is_working_day(day, country):
+        day += timedelta(days=1)
+    return day
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -199,6 +200,95 @@ LOGO_URL = config('LOGO_URL', default='')
 MEDIA_URL = config('MEDIA_URL', default='/media/')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Face recognition index shared by all workers (memory-mapped)
+FACE_INDEX_PATH = config('FACE_INDEX_PATH', default=os.path.join(BASE_DIR, 'face_index.bin'))
+FACE_INDEX_CHECK_INTERVAL = int(config('FACE_INDEX_CHECK_INTERVAL', default=30))  # seconds
+
+# Gunicorn worker processes (gunicorn reads the same variable, see Procfile); each runs
+# request threads that wait on its own face encoding pool
+WEB_CONCURRENCY = max(1, int(config('WEB_CONCURRENCY', default=2)))
+
+# Face encoding process pool used by the attendance endpoints
+FACE_POOL_WORKERS = int(config('FACE_POOL_WORKERS', default=0))  # per web worker, 0 = CPU cores / WEB_CONCURRENCY
+FACE_POOL_MAX_PENDING = int(config('FACE_POOL_MAX_PENDING', default=32))  # in-flight encodings, split across web workers
+FACE_POOL_TIMEOUT = float(config('FACE_POOL_TIMEOUT', default=20))  # seconds
+FACE_MAX_IMAGE_EDGE = int(config('FACE_MAX_IMAGE_EDGE', default=1024))  # px, images are downscaled before detection
+
+# Quality gate run before detection; check-in frames failing it are rejected with a reason
+FACE_QUALITY_GATE = config('FACE_QUALITY_GATE', default='True').lower() in ['true', '1', 't']
+FACE_MIN_IMAGE_EDGE = int(config('FACE_MIN_IMAGE_EDGE', default=160))  # px, shorter side of the upload
+FACE_MIN_BRIGHTNESS = int(config('FACE_MIN_BRIGHTNESS', default=35))  # median gray level, 0-255
+FACE_MAX_BRIGHTNESS = int(config('FACE_MAX_BRIGHTNESS', default=230))
+FACE_MIN_CONTRAST = int(config('FACE_MIN_CONTRAST', default=24))  # gray levels between the 1st and 99th percentile
+FACE_MIN_SHARPNESS = float(config('FACE_MIN_SHARPNESS', default=20))  # variance of the Laplacian
+FACE_MIN_FACE_SIZE = int(config('FACE_MIN_FACE_SIZE', default=40))  # px, face box side on the downscaled frame
+
+# Reference samples per person (profile picture included) and matching passes
+FACE_MAX_SAMPLES_PER_PERSON = int(config('FACE_MAX_SAMPLES_PER_PERSON', default=5))
+FACE_CENTROID_CANDIDATES = int(config('FACE_CENTROID_CANDIDATES', default=5))  # people re-checked sample by sample
+FACE_LEARN_FROM_CHECKINS = config('FACE_LEARN_FROM_CHECKINS', default='False').lower() in ['true', '1', 't']
+FACE_LEARN_MAX_DISTANCE = float(config('FACE_LEARN_MAX_DISTANCE', default=0.35))  # only very confident matches are kept
+FACE_LEARN_MIN_MARGIN = float(config('FACE_LEARN_MIN_MARGIN', default=0.1))  # distance gap to the runner-up person
+
+# Employee field the face index is partitioned by ('' disables partitioning); office
+# check-ins search their OfficeSite.face_partition first
+FACE_INDEX_PARTITION_FIELD = config('FACE_INDEX_PARTITION_FIELD', default='work_location')
+
+# Office sites (OfficeSite) are cached per process; other processes' edits are picked up
+# within this many seconds
+GEOFENCE_CHECK_INTERVAL = float(config('GEOFENCE_CHECK_INTERVAL', default=30))
+
+# Working-day calendar: Holiday rows of this country count as days off; calendars are
+# cached per process and re-validated against the shared cache this often (seconds)
+HOLIDAY_COUNTRY = config('HOLIDAY_COUNTRY', default='India')
+WORKING_CALENDAR_CHECK_INTERVAL = float(config('WORKING_CALENDAR_CHECK_INTERVAL', default=30))
+WORKING_CALENDAR_TTL = float(config('WORKING_CALENDAR_TTL', default=3600))  # seconds before a cached calendar is reloaded anyway
+
+# Caches. With REDIS_URL (the Redis channels_redis uses) entries are shared by all
+# workers and evicted by Redis' maxmemory policy (use allkeys-lru); without it each
+# worker keeps a bounded in-process LRU.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'hrms',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': int(config('CACHE_MAX_ENTRIES', default=2000))},
+        },
+    }
+
+# Repeated check-in uploads (double taps, client retries) replay the first response
+FACE_DEDUP_TTL = int(config('FACE_DEDUP_TTL', default=20))  # seconds
+FACE_DEDUP_LOCATION_DECIMALS = int(config('FACE_DEDUP_LOCATION_DECIMALS', default=3))  # ~110 m buckets
+
+# Asynchronous check-in tickets (process_checkin_tickets)
+CHECKIN_TICKET_MAX_ATTEMPTS = int(config('CHECKIN_TICKET_MAX_ATTEMPTS', default=3))  # retries while the face pool is busy
+CHECKIN_TICKET_RETRY_DELAY = float(config('CHECKIN_TICKET_RETRY_DELAY', default=2))  # seconds before the first retry, doubled after each
+CHECKIN_TICKET_STALE_AFTER = int(config('CHECKIN_TICKET_STALE_AFTER', default=300))  # seconds before a crashed worker's ticket is retaken
+CHECKIN_TICKET_RETENTION = int(config('CHECKIN_TICKET_RETENTION', default=86400))  # seconds finished tickets are kept
+
+# Payslip PDFs are rendered on their own process pool (not the face pool) and uploaded
+# to MinIO from a few threads sharing one client
+PAYSLIP_POOL_WORKERS = int(config('PAYSLIP_POOL_WORKERS', default=0))  # 0 = one per CPU core
+PAYSLIP_UPLOAD_THREADS = int(config('PAYSLIP_UPLOAD_THREADS', default=8))
+PAYSLIP_JOB_STALE_AFTER = int(config('PAYSLIP_JOB_STALE_AFTER', default=900))  # seconds without progress before a job counts as dead
+
+# Background scheduler. 'autoreload' runs it in the runserver process only, 'leader'
+# starts it in every process and runs jobs only in the one holding the leader lock
+# (a PostgreSQL advisory lock, or LEADER_LOCK_FILE on other databases), 'off' disables it
+SCHEDULER_MODE = config('SCHEDULER_MODE', default='autoreload')
+SCHEDULER_MISFIRE_GRACE_TIME = int(config('SCHEDULER_MISFIRE_GRACE_TIME', default=300))  # seconds a missed run may be late
+LEADER_LOCK_ID = int(config('LEADER_LOCK_ID', default=0x48524D53))  # advisory lock key shared by all nodes
+LEADER_LOCK_FILE = config('LEADER_LOCK_FILE', default=os.path.join(tempfile.gettempdir(), 'hrms-scheduler.lock'))
+LEADER_RETRY_INTERVAL = float(config('LEADER_RETRY_INTERVAL', default=5))  # seconds between election attempts
+
 # Logging configuration
 LOGGING = {
     'version': 1,